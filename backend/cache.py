@@ -0,0 +1,90 @@
+"""Small in-process caches.
+
+LRUCache is a bounded, optionally time-limited mapping for hot lookups that
+would otherwise hit MongoDB on every request. Given a sizeof function it also
+keeps count of the (approximate) bytes its values take. It is per process and not shared
+between workers, so it only holds data that is either immutable or explicitly
+invalidated by the code that changes it.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, sizeof: Optional[Callable[[Any], int]] = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self._misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._delete(key)
+            self._misses += 1
+            return default
+        self._data.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        if self.sizeof is not None:
+            size = self.sizeof(value)
+            self._bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._delete(next(iter(self._data)))
+            self._evictions += 1
+
+    def _delete(self, key: Hashable) -> tuple:
+        self._bytes -= self._sizes.pop(key, 0)
+        return self._data.pop(key)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._data:
+            return default
+        return self._delete(key)[0]
+
+    def evict_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Remove every entry whose value matches predicate, returns the number removed"""
+        keys = [key for key, (value, _) in self._data.items() if predicate(value)]
+        for key in keys:
+            self._delete(key)
+        return len(keys)
+
+    def clear(self):
+        self._data.clear()
+        self._sizes.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            **({"bytes": self._bytes} if self.sizeof is not None else {})
+        }
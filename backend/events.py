@@ -0,0 +1,203 @@
+"""Server-Sent Events fan-out.
+
+EventBroadcaster keeps one set of subscriber queues per process, so any number
+of open browser tabs share a single source of events instead of each polling
+the database. Events are numbered with a global sequence and kept in a short
+replay buffer; a client reconnecting with Last-Event-ID gets what it missed, or
+a "reset" event if that is no longer available and it should refetch.
+
+When a MongoDB collection is given, events are also persisted there (a capped
+collection) and every process relays events published by other processes, so
+a job finishing on one backend worker reaches tabs connected to another.
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+class Event:
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, id: int, type: str, data: Dict[str, Any]):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def encode(self) -> str:
+        """Wire format of a single SSE message"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=_json_default)}\n\n"
+
+
+class EventBroadcaster:
+    def __init__(
+        self,
+        collection=None,
+        counters=None,
+        name: str = "events",
+        buffer_size: int = 500,
+        queue_size: int = 200,
+        poll_interval: float = 0.25,
+        gap_timeout: float = 1.0
+    ):
+        self.collection = collection
+        self.counters = counters
+        self.name = name
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._last_seq = 0
+        self._local_seq = 0
+        self._relay_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._published = 0
+        self._dropped_subscribers = 0
+
+    # ---------- lifecycle ----------
+
+    async def start(self):
+        if self.collection is None:
+            return
+        latest = await self.collection.find_one({}, {"_id": 0, "seq": 1}, sort=[("seq", -1)])
+        self._last_seq = latest["seq"] if latest else 0
+        self._relay_task = asyncio.create_task(self._relay_loop())
+
+    async def stop(self):
+        if self._relay_task:
+            self._relay_task.cancel()
+            await asyncio.gather(self._relay_task, return_exceptions=True)
+            self._relay_task = None
+
+    # ---------- publishing ----------
+
+    async def publish(self, event_type: str, data: Dict[str, Any]):
+        self._published += 1
+        if self.collection is None:
+            self._local_seq += 1
+            self._dispatch(Event(self._local_seq, event_type, data))
+            return
+
+        counter = await self.counters.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await self.collection.insert_one({
+            "seq": counter["seq"],
+            "type": event_type,
+            "data": data,
+            "created_at": datetime.now(timezone.utc)
+        })
+        # Deliver through the relay so local and remote events share one ordering
+        self._wakeup.set()
+
+    def _dispatch(self, event: Event):
+        self._buffer.append(event)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A subscriber that can't keep up is cut off; its client reconnects with Last-Event-ID
+                self._subscribers.discard(queue)
+                self._dropped_subscribers += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _relay_loop(self):
+        gap_since: Optional[float] = None
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                rows = await self.collection.find(
+                    {"seq": {"$gt": self._last_seq}},
+                    {"_id": 0, "seq": 1, "type": 1, "data": 1}
+                ).sort("seq", 1).to_list(500)
+
+                for row in rows:
+                    if row["seq"] != self._last_seq + 1:
+                        # A concurrent publisher may still be inserting the missing sequence number
+                        gap_since = gap_since or loop.time()
+                        if loop.time() - gap_since < self.gap_timeout:
+                            break
+                    gap_since = None
+                    self._last_seq = row["seq"]
+                    self._dispatch(Event(row["seq"], row["type"], row["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event relay '{self.name}' failed: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # ---------- subscribing ----------
+
+    async def _replay(self, last_event_id: int) -> Optional[list]:
+        """Events after last_event_id, or None if they are no longer available"""
+        if self._buffer and self._buffer[0].id <= last_event_id + 1:
+            return [event for event in self._buffer if event.id > last_event_id]
+        if self.collection is not None:
+            rows = await self.collection.find(
+                {"seq": {"$gt": last_event_id}},
+                {"_id": 0, "seq": 1, "type": 1, "data": 1}
+            ).sort("seq", 1).to_list(self._buffer.maxlen)
+            if rows and rows[0]["seq"] == last_event_id + 1:
+                return [Event(row["seq"], row["type"], row["data"]) for row in rows if row["seq"] <= self._last_seq]
+            if not rows and last_event_id >= self._last_seq:
+                return []
+        if not self._buffer and last_event_id >= self._local_seq:
+            return []
+        return None
+
+    @asynccontextmanager
+    async def subscribe(self, last_event_id: Optional[int] = None) -> AsyncIterator[asyncio.Queue]:
+        """Yield a queue receiving Event objects; None in the queue means the subscription was dropped"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            if last_event_id is not None:
+                missed = await self._replay(last_event_id)
+                # Events dispatched while replaying are already queued; put the replay in front of them
+                arrived = []
+                while not queue.empty():
+                    arrived.append(queue.get_nowait())
+                if missed is None or len(missed) > self.queue_size // 2:
+                    replay = [Event(self.last_event_id, "reset", {})]
+                else:
+                    replay = missed
+                replayed_up_to = replay[-1].id if replay else last_event_id
+                for event in replay + [e for e in arrived if e is None or e.id > replayed_up_to]:
+                    queue.put_nowait(event)
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_seq if self.collection is not None else self._local_seq
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self._published,
+            "last_event_id": self.last_event_id,
+            "dropped_subscribers": self._dropped_subscribers
+        }
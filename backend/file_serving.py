@@ -0,0 +1,149 @@
+"""HTTP file responses with conditional GET and byte-range support.
+
+Starlette's FileResponse (in the version we pin) streams the whole file and has
+no notion of Range or If-None-Match. serve_file() adds:
+
+- strong ETags supplied by the caller (e.g. a content hash) and 304 responses
+  for If-None-Match / If-Modified-Since,
+- single byte ranges (206) including If-Range, and 416 for unsatisfiable ranges,
+- zero-copy transfer where the ASGI server offers it: full files go through
+  FileResponse (http.response.pathsend), ranges through
+  http.response.zerocopysend; otherwise the file is streamed in chunks.
+"""
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+import aiofiles
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 256 * 1024
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    # If-None-Match uses weak comparison
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def _not_modified(request: Request, etag: Optional[str], mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=' range into inclusive (start, end).
+
+    Returns None when the header should be ignored (malformed or multiple ranges),
+    raises ValueError when the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, sep, end_s = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        start = int(start_s) if start_s else None
+        end = int(end_s) if end_s else None
+    except ValueError:
+        return None
+    if start is None:
+        if not end:
+            raise ValueError("empty suffix range")
+        start, end = max(0, size - end), size - 1
+    elif end is None:
+        end = size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(Response):
+    """206 response for one byte range of a file"""
+
+    def __init__(self, path: str, start: int, end: int, size: int, media_type: str, headers: Dict[str, str]):
+        super().__init__(status_code=206, media_type=media_type, headers={
+            **headers,
+            "content-range": f"bytes {start}-{end}/{size}",
+            "content-length": str(end - start + 1)
+        })
+        self.path = path
+        self.start = start
+        self.end = end
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(), "offset": self.start, "count": count})
+            return
+
+        async with aiofiles.open(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # File shrank underneath us; close the response properly anyway
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def serve_file(
+    request: Request,
+    path: str,
+    media_type: str,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    stat_result: Optional[os.stat_result] = None
+) -> Response:
+    """Build the right response (200/206/304/416) for serving path to this request.
+
+    etag should be a strong validator including quotes, e.g. '"<sha256>"'.
+    """
+    stat_result = stat_result or os.stat(path)
+    size = stat_result.st_size
+    base_headers = {
+        **(headers or {}),
+        "accept-ranges": "bytes",
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True)
+    }
+    if etag:
+        base_headers["etag"] = etag
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers={k: v for k, v in base_headers.items() if k != "accept-ranges"})
+
+    range_header = request.headers.get("range")
+    if range_header and size > 0:
+        if_range = request.headers.get("if-range")
+        # If-Range with a stale validator means: send the whole (new) file instead
+        if if_range is None or (etag is not None and if_range.strip() == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={**base_headers, "content-range": f"bytes */{size}"})
+            if byte_range is not None:
+                start, end = byte_range
+                return RangeFileResponse(path, start, end, size, media_type, base_headers)
+
+    return FileResponse(path, media_type=media_type, headers=base_headers, stat_result=stat_result)
@@ -0,0 +1,94 @@
+"""Resized and re-encoded variants of uploaded images.
+
+Decoding and resampling a multi-megapixel photo takes hundreds of milliseconds
+of CPU, so render_variants() is meant to run in a worker process (see
+WorkerPool.run). Variants are written next to each other on disk and never
+change, so they can be served with long-lived cache headers.
+"""
+import os
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageOps
+
+# Widths offered to clients (thumbnail, medium, large); requested widths snap up to one of these
+VARIANT_WIDTHS = (320, 800, 1600)
+
+# format name -> (file extension, media type)
+FORMATS = {
+    "jpeg": ("jpg", "image/jpeg"),
+    "png": ("png", "image/png"),
+    "webp": ("webp", "image/webp"),
+}
+
+CONTENT_TYPE_FORMATS = {
+    "image/jpeg": "jpeg",
+    "image/png": "png",
+    "image/webp": "webp",
+}
+
+
+def variant_format(content_type: str) -> Optional[str]:
+    """Output format used for variants of an image, None if it is not resized (e.g. animated GIF)"""
+    return CONTENT_TYPE_FORMATS.get(content_type)
+
+
+def snap_width(requested: int, original_width: Optional[int] = None) -> Optional[int]:
+    """Smallest offered width >= requested, or None when the full size should be served instead"""
+    width = next((w for w in VARIANT_WIDTHS if w >= requested), None)
+    if width is None or (original_width and width >= original_width):
+        return None
+    return width
+
+
+def variant_path(variant_dir: str, width: Optional[int], fmt: str) -> str:
+    name = f"w{width}" if width else "full"
+    return os.path.join(variant_dir, f"{name}.{FORMATS[fmt][0]}")
+
+
+def probe(path: str) -> Tuple[int, int]:
+    """(width, height) as displayed, i.e. after applying the EXIF orientation"""
+    with Image.open(path) as img:
+        width, height = img.size
+        orientation = img.getexif().get(0x0112)
+    return (height, width) if orientation in (5, 6, 7, 8) else (width, height)
+
+
+def _save(img: Image.Image, path: str, fmt: str):
+    if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    elif img.mode not in ("RGB", "RGBA", "L", "LA"):
+        img = img.convert("RGBA")
+
+    options = {
+        "jpeg": {"quality": 82, "optimize": True, "progressive": True},
+        "png": {"optimize": True},
+        "webp": {"quality": 80, "method": 4},
+    }[fmt]
+    # Write under a temporary name so concurrent readers never see a half-written file
+    temp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+    img.save(temp_path, format=fmt.upper(), **options)
+    os.replace(temp_path, path)
+
+
+def render_variants(source_path: str, variant_dir: str, widths: Sequence[Optional[int]], formats: Sequence[str]) -> List[Dict]:
+    """Write every (width, format) combination that does not exist yet; width None keeps the full size.
+
+    Returns one dict per variant with path, width and size in bytes.
+    """
+    os.makedirs(variant_dir, exist_ok=True)
+    rendered = []
+    with Image.open(source_path) as original:
+        img = ImageOps.exif_transpose(original)
+        img.load()
+        for fmt in formats:
+            for width in widths:
+                path = variant_path(variant_dir, width, fmt)
+                if not os.path.exists(path):
+                    if width and width < img.width:
+                        height = max(1, round(img.height * width / img.width))
+                        _save(img.resize((width, height), Image.LANCZOS), path, fmt)
+                    else:
+                        _save(img, path, fmt)
+                rendered.append({"path": path, "width": width, "size": os.path.getsize(path)})
+    return rendered
@@ -0,0 +1,311 @@
+"""Durable job queue on top of a MongoDB collection.
+
+Jobs are claimed atomically with find_one_and_update and held with a lease that
+the running worker keeps extending (heartbeat). If a worker process dies, its
+lease runs out and any other worker picks the job up again, so work survives
+restarts and crashes. The number of worker coroutines per process bounds how
+many jobs run concurrently.
+
+Job document layout:
+    job_id, kind, key, payload, status (queued|running|completed|failed),
+    unfinished (true while queued or running), attempts, max_attempts, run_at, lease_expires_at, worker_id, last_error,
+    created_at, updated_at, finished_at
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+FailureHandler = Callable[[Dict[str, Any], Exception, bool], Awaitable[None]]
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot succeed"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    def __init__(
+        self,
+        collection,
+        workers: int = int(os.environ.get("JOB_WORKERS", "2")),
+        lease_seconds: int = int(os.environ.get("JOB_LEASE_SECONDS", "120")),
+        max_attempts: int = int(os.environ.get("JOB_MAX_ATTEMPTS", "3")),
+        backoff_seconds: float = float(os.environ.get("JOB_BACKOFF_SECONDS", "10")),
+        poll_interval: float = 2.0
+    ):
+        self.collection = collection
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = max(1.0, lease_seconds / 4)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._failure_handlers: Dict[str, FailureHandler] = {}
+        self._tasks: list = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+
+    def register(self, kind: str, handler: JobHandler, on_failure: Optional[FailureHandler] = None):
+        """Register the coroutine that runs jobs of the given kind.
+
+        on_failure is awaited with (job, error, will_retry) whenever an attempt fails.
+        """
+        self._handlers[kind] = handler
+        if on_failure:
+            self._failure_handlers[kind] = on_failure
+
+    async def create_indexes(self):
+        await self.collection.create_index("job_id", unique=True)
+        await self.collection.create_index([("status", 1), ("run_at", 1)])
+        await self.collection.create_index([("status", 1), ("lease_expires_at", 1)])
+        await self.collection.create_index("key")
+        # At most one unfinished job per key, also when enqueue() races with itself. A flag
+        # rather than the status: partial indexes only accept $in from MongoDB 6.0 on.
+        await self.collection.create_index(
+            "key",
+            name="key_unfinished",
+            unique=True,
+            partialFilterExpression={"key": {"$type": "string"}, "unfinished": True}
+        )
+        # Finished jobs are only kept for inspection for a week
+        await self.collection.create_index(
+            "finished_at",
+            expireAfterSeconds=7 * 24 * 3600,
+            partialFilterExpression={"status": "completed"}
+        )
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], key: Optional[str] = None) -> str:
+        """Persist a new job and wake up a local worker. Returns the job_id.
+
+        If key is given and an unfinished job with the same key exists, that job is reused.
+        """
+        while True:
+            if key:
+                # Same condition as the unique index, so a lost insert always finds the winner
+                existing = await self.collection.find_one(
+                    {"key": key, "unfinished": True},
+                    {"_id": 0, "job_id": 1}
+                )
+                if existing:
+                    return existing["job_id"]
+
+            now = _now()
+            job_id = f"job_{uuid.uuid4().hex[:12]}"
+            try:
+                await self.collection.insert_one({
+                    "job_id": job_id,
+                    "kind": kind,
+                    "key": key,
+                    "payload": payload,
+                    "status": "queued",
+                    "unfinished": True,
+                    "attempts": 0,
+                    "max_attempts": self.max_attempts,
+                    "run_at": now,
+                    "lease_expires_at": None,
+                    "worker_id": None,
+                    "last_error": None,
+                    "created_at": now,
+                    "updated_at": now
+                })
+            except DuplicateKeyError:
+                # A concurrent enqueue for the same key won; look its job up again
+                continue
+            self._wakeup.set()
+            return job_id
+
+    async def cancel(self, key: str) -> int:
+        """Drop queued jobs for a key; running jobs finish but their result is the handler's concern"""
+        result = await self.collection.delete_many({"key": key, "status": "queued"})
+        return result.deleted_count
+
+    async def recover_orphans(self) -> int:
+        """Requeue running jobs whose lease expired, e.g. because their worker crashed"""
+        now = _now()
+        result = await self.collection.update_many(
+            {"status": "running", "lease_expires_at": {"$lt": now}},
+            {"$set": {"status": "queued", "run_at": now, "worker_id": None, "updated_at": now}}
+        )
+        if result.modified_count:
+            logger.warning(f"Recovered {result.modified_count} orphaned job(s)")
+        return result.modified_count
+
+    async def start(self):
+        self._stopping = False
+        await self.recover_orphans()
+        self._tasks = [asyncio.create_task(self._worker_loop(n)) for n in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} worker(s) as {self.worker_id}")
+
+    async def stop(self):
+        """Stop the workers and hand jobs still running here back to the queue"""
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        now = _now()
+        # The interrupted attempt was not the job's fault, so don't count it
+        await self.collection.update_many(
+            {"status": "running", "worker_id": self.worker_id},
+            {"$set": {"status": "queued", "run_at": now, "worker_id": None, "updated_at": now},
+             "$inc": {"attempts": -1}}
+        )
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "run_at": {"$lte": now}},
+                {"status": "running", "lease_expires_at": {"$lt": now}}
+            ]},
+            {"$set": {
+                "status": "running",
+                "worker_id": self.worker_id,
+                "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                "started_at": now,
+                "updated_at": now
+            }, "$inc": {"attempts": 1}},
+            sort=[("run_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _worker_loop(self, n: int):
+        while not self._stopping:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Job worker {n} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {n} failed while running job {job.get('job_id')}: {e}")
+
+    async def _heartbeat(self, job_id: str, handler_task: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            now = _now()
+            result = await self.collection.update_one(
+                {"job_id": job_id, "worker_id": self.worker_id, "status": "running"},
+                {"$set": {"lease_expires_at": now + timedelta(seconds=self.lease_seconds), "updated_at": now}}
+            )
+            if result.matched_count == 0:
+                logger.warning(f"Lost lease on job {job_id}, abandoning it")
+                handler_task.cancel()
+                return
+
+    async def _run(self, job: Dict[str, Any]):
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            await self._finish(job, "failed", f"Unbekannter Job-Typ: {job['kind']}")
+            return
+
+        self._in_flight += 1
+        handler_task = asyncio.create_task(handler(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job["job_id"], handler_task))
+        try:
+            await handler_task
+        except asyncio.CancelledError:
+            if self._stopping:
+                raise
+            # Lease was lost: another worker owns the job now
+            return
+        except Exception as e:
+            await self._handle_failure(job, e)
+        else:
+            self._completed += 1
+            await self._finish(job, "completed")
+        finally:
+            heartbeat.cancel()
+            self._in_flight -= 1
+
+    async def _handle_failure(self, job: Dict[str, Any], error: Exception):
+        attempts = job.get("attempts", 1)
+        will_retry = not isinstance(error, PermanentJobError) and attempts < job.get("max_attempts", self.max_attempts)
+        logger.error(f"Job {job['job_id']} ({job['kind']}) attempt {attempts} failed: {error}")
+
+        on_failure = self._failure_handlers.get(job["kind"])
+        if on_failure:
+            try:
+                await on_failure(job, error, will_retry)
+            except Exception as e:
+                logger.error(f"Failure handler for job {job['job_id']} raised: {e}")
+
+        if not will_retry:
+            self._failed += 1
+            await self._finish(job, "failed", str(error))
+            return
+
+        self._retried += 1
+        delay = self.backoff_seconds * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+        now = _now()
+        await self.collection.update_one(
+            {"job_id": job["job_id"], "worker_id": self.worker_id},
+            {"$set": {
+                "status": "queued",
+                "run_at": now + timedelta(seconds=delay),
+                "worker_id": None,
+                "lease_expires_at": None,
+                "last_error": str(error),
+                "updated_at": now
+            }}
+        )
+
+    async def _finish(self, job: Dict[str, Any], status: str, error: Optional[str] = None):
+        now = _now()
+        update = {
+            "status": status, "unfinished": False, "lease_expires_at": None, "finished_at": now, "updated_at": now
+        }
+        if error is not None:
+            update["last_error"] = error
+        await self.collection.update_one(
+            {"job_id": job["job_id"], "worker_id": self.worker_id},
+            {"$set": update}
+        )
+
+    async def counts(self) -> Dict[str, int]:
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {row["_id"]: row["count"] async for row in self.collection.aggregate(pipeline)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "retried": self._retried
+        }
@@ -0,0 +1,153 @@
+"""Versioned schema/data migrations.
+
+Every migration has a version number and runs exactly once per database: the
+applied versions are recorded in the `migrations` collection. Only one process
+migrates at a time, guarded by a lock document with a lease that the runner
+keeps extending; a crashed runner's lock simply expires. Workers that start
+while the schema is already current only read the applied versions and are done.
+
+    migrations = MigrationRunner(db.migrations)
+
+    @migrations.register(1, "create indexes")
+    async def create_indexes():
+        ...
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+LOCK_ID = "__lock__"
+
+MigrationFn = Callable[[], Awaitable[None]]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def bulk_update(
+    collection,
+    query: Dict[str, Any],
+    projection: Dict[str, Any],
+    build_update: Callable[[Dict[str, Any]], Any],
+    batch_size: int = 500,
+    label: str = "",
+    prepare: Optional[Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]] = None
+) -> int:
+    """Apply build_update(doc) -> UpdateOne to every document matching query, one bulk_write per batch.
+
+    query must stop matching a document once it is updated; that makes the loop
+    terminate and an interrupted run resumable. prepare, if given, is awaited with
+    each batch and returns the documents passed to build_update, so CPU-heavy work
+    can run in a pool instead of on the event loop.
+    """
+    processed = 0
+    while True:
+        rows = await collection.find(query, projection).limit(batch_size).to_list(batch_size)
+        if not rows:
+            return processed
+        if prepare:
+            rows = await prepare(rows)
+        await collection.bulk_write([build_update(row) for row in rows], ordered=False)
+        processed += len(rows)
+        logger.info(f"Migration {label}: {processed} documents updated")
+
+
+class MigrationRunner:
+    def __init__(self, collection, lease_seconds: int = 60):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._migrations: Dict[int, tuple] = {}
+
+    def register(self, version: int, name: str) -> Callable[[MigrationFn], MigrationFn]:
+        def decorator(fn: MigrationFn) -> MigrationFn:
+            if version in self._migrations:
+                raise ValueError(f"Migration version {version} registered twice")
+            self._migrations[version] = (name, fn)
+            return fn
+        return decorator
+
+    async def pending(self) -> List[int]:
+        applied = {
+            row["version"] async for row in self.collection.find({"version": {"$exists": True}}, {"_id": 0, "version": 1})
+        }
+        return sorted(v for v in self._migrations if v not in applied)
+
+    async def _acquire_lock(self) -> bool:
+        now = _now()
+        try:
+            await self.collection.find_one_and_update(
+                {"_id": LOCK_ID, "$or": [{"expires_at": {"$lt": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The lock document exists and belongs to a live runner
+            return False
+
+    async def _keep_lock(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.collection.update_one(
+                {"_id": LOCK_ID, "owner": self.owner},
+                {"$set": {"expires_at": _now() + timedelta(seconds=self.lease_seconds)}}
+            )
+
+    async def _release_lock(self):
+        await self.collection.delete_one({"_id": LOCK_ID, "owner": self.owner})
+
+    async def run_pending(self) -> List[int]:
+        """Run all migrations that are not applied yet; returns the versions this call applied.
+
+        If another process holds the lock, nothing is done here: that process migrates.
+        """
+        if not await self.pending():
+            return []
+        if not await self._acquire_lock():
+            logger.info("Migrations are being applied by another worker")
+            return []
+
+        applied = []
+        keeper = asyncio.create_task(self._keep_lock())
+        try:
+            await self.collection.create_index("version", unique=True, sparse=True)
+            # Re-read under the lock, another worker may have finished in the meantime
+            for version in await self.pending():
+                name, fn = self._migrations[version]
+                logger.info(f"Applying migration {version}: {name}")
+                started = time.perf_counter()
+                await fn()
+                duration = round(time.perf_counter() - started, 3)
+                await self.collection.insert_one({
+                    "version": version,
+                    "name": name,
+                    "applied_at": _now(),
+                    "applied_by": self.owner,
+                    "duration_seconds": duration
+                })
+                applied.append(version)
+                logger.info(f"Migration {version} applied in {duration}s")
+        finally:
+            keeper.cancel()
+            await asyncio.gather(keeper, return_exceptions=True)
+            await self._release_lock()
+        return applied
+
+    async def status(self) -> Dict[str, Any]:
+        lock = await self.collection.find_one({"_id": LOCK_ID}, {"_id": 0})
+        return {
+            "registered": sorted(self._migrations),
+            "pending": await self.pending(),
+            "locked_by": lock["owner"] if lock and lock["expires_at"] > _now() else None
+        }
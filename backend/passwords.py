@@ -0,0 +1,97 @@
+"""Password hashing off the event loop.
+
+A bcrypt hash or verify costs a few hundred milliseconds of CPU. Called
+directly from a request handler it blocks every other request on the worker
+for that long, and a burst of logins stalls the whole API. PasswordHasher runs
+the work in a small thread pool (bcrypt releases the GIL) and bounds how many
+operations may wait for a thread; beyond that it fails fast with
+PasswordHasherBusy so the caller can answer 429 instead of queueing forever.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict
+
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_WAITING = int(os.environ.get("PASSWORD_HASH_MAX_WAITING", "32"))
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password operations are already waiting"""
+
+
+class LatencyRecorder:
+    """Keeps the most recent durations and reports percentiles over them"""
+
+    def __init__(self, window: int = 1000):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._count = 0
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+        self._count += 1
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+
+        def percentile(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+        return {
+            "count": self._count,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(samples[-1] * 1000, 1)
+        }
+
+
+class PasswordHasher:
+    def __init__(self, context, workers: int = PASSWORD_HASH_WORKERS, max_waiting: int = PASSWORD_HASH_MAX_WAITING):
+        self.context = context
+        self.workers = max(1, workers)
+        self.max_waiting = max(0, max_waiting)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        # The executor would queue unboundedly; the semaphore is what actually limits concurrency
+        self._slots = asyncio.Semaphore(self.workers)
+        self._waiting = 0
+        self._rejected = 0
+        self.latency = LatencyRecorder()
+
+    async def _run(self, fn, *args):
+        if self._slots.locked() and self._waiting >= self.max_waiting:
+            self._rejected += 1
+            raise PasswordHasherBusy()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            started = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            self.latency.record(time.perf_counter() - started)
+            return result
+        finally:
+            self._slots.release()
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_waiting": self.max_waiting,
+            "waiting": self._waiting,
+            "rejected": self._rejected,
+            "hash_latency": self.latency.stats()
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,215 @@
+"""PDF extraction engine.
+
+pdfplumber is pure Python and CPU bound, so running it inside the async request
+handlers blocks the event loop for the whole duration of a document. Everything
+in this module that touches a PDF runs in a ProcessPoolExecutor; the functions
+submitted to the pool are module level and free of side effects so they can be
+pickled and imported by the worker processes.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+# Bump when the extraction output changes so cached results of older versions are not reused
+EXTRACTION_VERSION = 1
+
+DEFAULT_WORKERS = int(os.environ.get("PDF_EXTRACTION_WORKERS", "0")) or min(os.cpu_count() or 1, 4)
+DEFAULT_PAGES_PER_JOB = int(os.environ.get("PDF_EXTRACTION_PAGES_PER_JOB", "20"))
+
+
+# ==================== WORKER FUNCTIONS (run in child processes) ====================
+
+def _timed_call(fn: Callable, *args) -> tuple:
+    """Run fn in the worker and return its result together with the CPU seconds it used"""
+    started = time.process_time()
+    result = fn(*args)
+    return result, time.process_time() - started
+
+
+def count_pages(file_path: str) -> int:
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def _table_to_html(table: List[List[Optional[str]]]) -> str:
+    table_html = "<table class='w-full border-collapse my-4 text-sm'>"
+    for row_idx, row in enumerate(table):
+        if row:
+            table_html += "<tr>"
+            for cell in row:
+                cell_content = cell if cell else ""
+                if row_idx == 0:
+                    table_html += f"<th class='border border-slate-400 bg-slate-100 p-2 font-semibold text-left'>{cell_content}</th>"
+                else:
+                    table_html += f"<td class='border border-slate-300 p-2'>{cell_content}</td>"
+            table_html += "</tr>"
+    table_html += "</table>"
+    return table_html
+
+
+def extract_page_range(file_path: str, first_page: int, last_page: int) -> List[Dict[str, Any]]:
+    """Extract text, HTML and tables for the pages first_page..last_page (1-based, inclusive)"""
+    pages = []
+    with pdfplumber.open(file_path, pages=list(range(first_page, last_page + 1))) as pdf:
+        for page in pdf.pages:
+            page_num = page.page_number
+            html_content = f"<div class='pdf-page' data-page='{page_num}'>"
+            extracted_text = ""
+            tables = []
+
+            text = page.extract_text()
+            if text:
+                extracted_text = f"--- Seite {page_num} ---\n{text}\n\n"
+                paragraphs = text.split('\n\n')
+                for para in paragraphs:
+                    if para.strip():
+                        if len(para.strip()) < 100 and para.strip().isupper():
+                            html_content += f"<h3>{para.strip()}</h3>"
+                        else:
+                            html_content += f"<p>{para.strip()}</p>"
+
+            for table_idx, table in enumerate(page.extract_tables()):
+                if table and len(table) > 0:
+                    table_html = _table_to_html(table)
+                    tables.append({
+                        "page": page_num,
+                        "index": table_idx,
+                        "html": table_html
+                    })
+                    html_content += table_html
+
+            html_content += "</div>"
+            pages.append({
+                "page": page_num,
+                "text": extracted_text,
+                "html": html_content,
+                "tables": tables
+            })
+            # Release pdfminer's per-page layout cache, long documents otherwise grow unbounded
+            page.flush_cache()
+    return pages
+
+
+# ==================== ENGINE (runs in the API process) ====================
+
+class WorkerPool:
+    """Dispatches picklable functions to a process pool and keeps simple counters about them"""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._jobs_completed = 0
+        self._jobs_failed = 0
+        self._cpu_seconds_total = 0.0
+        self._last_job_cpu_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn keeps the workers independent of the threads motor runs in this process
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"{type(self).__name__} started with {self.max_workers} worker processes")
+        return self._executor
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a picklable function in the pool and return its result"""
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        try:
+            result, cpu_seconds = await loop.run_in_executor(self._get_executor(), _timed_call, fn, *args)
+        except Exception:
+            self._jobs_failed += 1
+            raise
+        finally:
+            self._pending -= 1
+        self._jobs_completed += 1
+        self._cpu_seconds_total += cpu_seconds
+        self._last_job_cpu_seconds = cpu_seconds
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        completed = self._jobs_completed
+        return {
+            "pool_size": self.max_workers,
+            "running_jobs": min(self._pending, self.max_workers),
+            "queue_depth": max(0, self._pending - self.max_workers),
+            "jobs_completed": completed,
+            "jobs_failed": self._jobs_failed,
+            "cpu_seconds_total": round(self._cpu_seconds_total, 3),
+            "cpu_seconds_per_job_avg": round(self._cpu_seconds_total / completed, 3) if completed else 0.0,
+            "cpu_seconds_last_job": round(self._last_job_cpu_seconds, 3)
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class ExtractionEngine(WorkerPool):
+    """WorkerPool that extracts PDFs by fanning page ranges out over its workers"""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, pages_per_job: int = DEFAULT_PAGES_PER_JOB):
+        super().__init__(max_workers)
+        self.pages_per_job = max(1, pages_per_job)
+        self._documents_completed = 0
+
+    async def extract(
+        self,
+        file_path: str,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Extract a whole PDF, fanning page ranges out over the pool.
+
+        on_progress is awaited with (pages_done, page_count) after every finished range.
+        """
+        started = time.perf_counter()
+        cpu_before = self._cpu_seconds_total
+        page_count = await self.run(count_pages, file_path)
+
+        ranges = [
+            (first, min(first + self.pages_per_job - 1, page_count))
+            for first in range(1, page_count + 1, self.pages_per_job)
+        ]
+        tasks = [asyncio.ensure_future(self.run(extract_page_range, file_path, first, last)) for first, last in ranges]
+
+        pages: List[Dict[str, Any]] = []
+        try:
+            for finished in asyncio.as_completed(tasks):
+                pages.extend(await finished)
+                if on_progress:
+                    await on_progress(len(pages), page_count)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        pages.sort(key=lambda p: p["page"])
+        self._documents_completed += 1
+        return {
+            "page_count": page_count,
+            "extracted_text": "".join(p["text"] for p in pages),
+            "html_content": "".join(p["html"] for p in pages),
+            "tables": [table for p in pages for table in p["tables"]],
+            # Approximation when several documents share the pool, exact when run alone
+            "cpu_seconds": round(self._cpu_seconds_total - cpu_before, 3),
+            "wall_seconds": round(time.perf_counter() - started, 3)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "pages_per_job": self.pages_per_job,
+            "documents_completed": self._documents_completed
+        }
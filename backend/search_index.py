@@ -0,0 +1,373 @@
+"""In-process BM25F full-text index.
+
+Documents have a fixed set of text fields. For every term the index keeps one
+posting list: the document slots containing it plus, per field, how often the
+term occurs there, as flat array.arrays (4 bytes per slot, 1 per frequency).
+Scoring is BM25F: per-field term frequencies are length-normalised against that
+field's average length, weighted and summed before the usual BM25 saturation,
+so a hit in a short title counts for more than the same hit buried in a long
+body. The scoring loop runs over whole posting lists with NumPy, one vector
+operation per query term.
+
+The vocabulary (every term with a posting list) is also kept in a trigram
+index, so similar_terms() can map a misspelt query term to the terms it was
+probably meant to be.
+
+Documents can also be added with prefixes (e.g. of the words of their title),
+kept in plain slot lists without frequencies; prefix_search() returns the
+documents having all of the given prefixes, ordered by a metadata field.
+
+Updates are incremental: add() replaces a document, remove() takes it out of
+its posting lists (swap-with-last, the order of a posting list is irrelevant)
+and frees its slot for reuse. The complete state can be serialised with
+snapshot() and loaded back with restore() so a restarted process doesn't have
+to re-read and re-tokenise the whole corpus.
+
+The index is not thread-safe; use it from one thread (the event loop).
+"""
+import heapq
+import math
+import os
+import pickle
+import sys
+import tempfile
+from array import array
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from text_analysis import analyze
+from trigram_index import TrigramIndex
+
+FIELDS = ("title", "summary", "tags", "content")
+DEFAULT_FIELD_WEIGHTS = {"title": 10.0, "summary": 5.0, "tags": 3.0, "content": 1.0}
+# Length normalisation per field: titles and tags are short and similar in length
+DEFAULT_FIELD_B = {"title": 0.5, "summary": 0.75, "tags": 0.3, "content": 0.75}
+MAX_TF = 255
+SNAPSHOT_FORMAT = 3
+
+
+class SearchIndex:
+    def __init__(
+        self,
+        field_weights: Optional[Dict[str, float]] = None,
+        field_b: Optional[Dict[str, float]] = None,
+        k1: float = 1.2,
+        analyzer: Callable[[str], List[str]] = analyze,
+        version: str = "1"
+    ):
+        """version identifies the analyzer; snapshots taken with another version are rejected"""
+        weights = {**DEFAULT_FIELD_WEIGHTS, **(field_weights or {})}
+        b = {**DEFAULT_FIELD_B, **(field_b or {})}
+        self.fields = FIELDS
+        self.k1 = k1
+        self.analyzer = analyzer
+        self.version = version
+        self._weights = np.array([weights[f] for f in FIELDS], dtype=np.float32)
+        self._b = np.array([min(max(b[f], 0.0), 0.99) for f in FIELDS], dtype=np.float32)
+        self.clear()
+
+    def clear(self):
+        self._ids: List[Optional[str]] = []
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        # Per slot: the document's terms (to find its postings on removal) and filter metadata
+        self._terms: List[Optional[Tuple[str, ...]]] = []
+        self._slot_prefixes: List[Optional[Tuple[str, ...]]] = []
+        self._meta: List[Optional[Dict[str, Any]]] = []
+        self._lengths = np.zeros((64, len(FIELDS)), dtype=np.float32)
+        self._length_sums = np.zeros(len(FIELDS), dtype=np.float64)
+        # term -> [slots, tf of field 0, tf of field 1, ...]; a term frequency is capped at
+        # MAX_TF so it fits a byte, BM25 has long saturated at that point
+        self._postings: Dict[str, List[array]] = {}
+        # prefix -> slots
+        self._prefixes: Dict[str, array] = {}
+        self._vocabulary = TrigramIndex()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    def ids(self) -> List[str]:
+        return list(self._slots)
+
+    def meta(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        slot = self._slots.get(doc_id)
+        return self._meta[slot] if slot is not None else None
+
+    def _analyze(self, value: Any) -> List[str]:
+        if not value:
+            return []
+        if isinstance(value, (list, tuple)):
+            # Already analyzed (terms stored with the document)
+            return value
+        return self.analyzer(value)
+
+    def _new_slot(self) -> int:
+        if self._free:
+            return self._free.pop()
+        slot = len(self._ids)
+        if slot >= len(self._lengths):
+            grown = np.zeros((len(self._lengths) * 2, len(FIELDS)), dtype=np.float32)
+            grown[:slot] = self._lengths
+            self._lengths = grown
+        self._ids.append(None)
+        self._terms.append(None)
+        self._slot_prefixes.append(None)
+        self._meta.append(None)
+        return slot
+
+    def add(
+        self,
+        doc_id: str,
+        fields: Dict[str, Any],
+        meta: Optional[Dict[str, Any]] = None,
+        prefixes: Iterable[str] = ()
+    ):
+        """Index (or re-index) a document; fields maps field name to text or to its analyzed terms"""
+        self.remove(doc_id)
+        counts = [Counter(self._analyze(fields.get(field))) for field in FIELDS]
+        # Interned so the per-document term tuples share the strings of the postings keys
+        terms = {sys.intern(term) for term in set().union(*counts)}
+        slot = self._new_slot()
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = [array("I")] + [array("B") for _ in FIELDS]
+                self._vocabulary.add(term)
+            posting[0].append(slot)
+            for i, count in enumerate(counts, start=1):
+                posting[i].append(min(count.get(term, 0), MAX_TF))
+        lengths = [sum(count.values()) for count in counts]
+        self._lengths[slot] = lengths
+        self._length_sums += lengths
+        self._ids[slot] = doc_id
+        self._slots[doc_id] = slot
+        self._terms[slot] = tuple(terms)
+        self._meta[slot] = meta or {}
+        self._slot_prefixes[slot] = tuple(sys.intern(prefix) for prefix in set(prefixes))
+        for prefix in self._slot_prefixes[slot]:
+            slots = self._prefixes.get(prefix)
+            if slots is None:
+                slots = self._prefixes[prefix] = array("I")
+            slots.append(slot)
+
+    def remove(self, doc_id: str) -> bool:
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return False
+        for term in self._terms[slot]:
+            posting = self._postings[term]
+            if len(posting[0]) == 1:
+                del self._postings[term]
+                self._vocabulary.remove(term)
+                continue
+            i = posting[0].index(slot)
+            for values in posting:
+                values[i] = values[-1]
+                values.pop()
+        for prefix in self._slot_prefixes[slot]:
+            slots = self._prefixes[prefix]
+            if len(slots) == 1:
+                del self._prefixes[prefix]
+                continue
+            i = slots.index(slot)
+            slots[i] = slots[-1]
+            slots.pop()
+        self._length_sums -= self._lengths[slot]
+        self._lengths[slot] = 0
+        self._ids[slot] = None
+        self._terms[slot] = None
+        self._slot_prefixes[slot] = None
+        self._meta[slot] = None
+        self._free.append(slot)
+        return True
+
+    def _scores(self, terms: Iterable[str]) -> np.ndarray:
+        count = len(self._slots)
+        average = (self._length_sums / count).astype(np.float32)
+        average[average == 0] = 1.0
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            # np.array copies; a buffer view would pin the array.array against resizing
+            slots = np.array(posting[0], dtype=np.intp)
+            tf = np.stack([np.array(values, dtype=np.float32) for values in posting[1:]], axis=1)
+            norm = 1.0 - self._b + self._b * self._lengths[slots] / average
+            weighted = (tf * self._weights / norm).sum(axis=1)
+            df = len(slots)
+            idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+            scores[slots] += idf * weighted / (self.k1 + weighted)
+        return scores
+
+    def search(
+        self,
+        query: Union[str, List[str]],
+        limit: int = 10,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """Best matching (doc_id, score) pairs, highest score first.
+
+        query is text or its analyzed terms; any term may match. where filters on
+        the metadata passed to add().
+        """
+        terms = set(self._analyze(query))
+        if not terms or not self._slots or limit <= 0:
+            return []
+        scores = self._scores(terms)
+        candidates = np.flatnonzero(scores)
+        # Only rank as many candidates as needed; widen if the filter rejects too many
+        wanted = limit if where is None else limit * 4
+        while True:
+            if wanted < len(candidates):
+                top = candidates[np.argpartition(-scores[candidates], wanted)[:wanted]]
+            else:
+                top = candidates
+            top = top[np.argsort(-scores[top], kind="stable")]
+            hits = [
+                (self._ids[slot], float(scores[slot]))
+                for slot in top
+                if where is None or where(self._meta[slot])
+            ]
+            if len(hits) >= limit or len(top) == len(candidates):
+                return hits[:limit]
+            wanted *= 4
+
+    def facets(
+        self,
+        query: Union[str, List[str]],
+        fields: Iterable[str],
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Dict[str, Counter]:
+        """For each metadata field, how many documents matching query have each value.
+
+        A document matches if it contains any of the terms (like search()) and
+        passes where; list values count once per item.
+        """
+        fields = tuple(fields)
+        counts = {field: Counter() for field in fields}
+        postings = [self._postings[term][0] for term in set(self._analyze(query)) if term in self._postings]
+        if not postings:
+            return counts
+        for slot in np.unique(np.concatenate([np.array(slots, dtype=np.intp) for slots in postings])):
+            meta = self._meta[slot]
+            if where is not None and not where(meta):
+                continue
+            for field in fields:
+                value = meta.get(field)
+                if isinstance(value, (list, tuple)):
+                    counts[field].update(value)
+                else:
+                    counts[field][value] += 1
+        return counts
+
+    def prefix_search(
+        self,
+        prefixes: Iterable[str],
+        limit: int,
+        rank_by: str,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> List[str]:
+        """Ids of the documents added with all of prefixes, highest meta[rank_by] first"""
+        postings = [self._prefixes.get(prefix) for prefix in set(prefixes)]
+        if not postings or None in postings or limit <= 0:
+            return []
+        # Intersect starting with the most selective prefix
+        postings.sort(key=len)
+        slots = np.array(postings[0], dtype=np.intp)
+        for posting in postings[1:]:
+            slots = np.intersect1d(slots, np.array(posting, dtype=np.intp), assume_unique=True)
+        if where is not None:
+            slots = [slot for slot in slots if where(self._meta[slot])]
+        top = heapq.nlargest(limit, slots, key=lambda slot: self._meta[slot].get(rank_by) or 0)
+        return [self._ids[slot] for slot in top]
+
+    def has_term(self, term: str) -> bool:
+        return term in self._postings
+
+    def similar_terms(self, term: str, max_distance: int, deadline: Optional[float] = None) -> List[str]:
+        """Indexed terms within max_distance edits of term; closest, then most frequent first"""
+        matches = self._vocabulary.similar(term, max_distance, deadline)
+        matches.sort(key=lambda match: (match[1], -len(self._postings[match[0]][0])))
+        return [similar for similar, _ in matches]
+
+    def snapshot(self, extra: Any = None) -> bytes:
+        """Serialised state; extra is stored alongside and returned by restore()"""
+        size = len(self._ids)
+        return pickle.dumps({
+            "format": SNAPSHOT_FORMAT,
+            "version": self.version,
+            "fields": FIELDS,
+            "ids": self._ids,
+            "free": self._free,
+            "terms": self._terms,
+            "slot_prefixes": self._slot_prefixes,
+            "meta": self._meta,
+            "lengths": self._lengths[:size].copy(),
+            "postings": self._postings,
+            "prefixes": self._prefixes,
+            "vocabulary": self._vocabulary,
+            "extra": extra
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, data: bytes) -> Any:
+        state = pickle.loads(data)
+        if (state.get("format"), state.get("version"), state.get("fields")) != (SNAPSHOT_FORMAT, self.version, FIELDS):
+            raise ValueError("Snapshot was taken with another index format or analyzer")
+        self.clear()
+        self._ids = state["ids"]
+        self._free = state["free"]
+        self._terms = state["terms"]
+        self._slot_prefixes = state["slot_prefixes"]
+        self._meta = state["meta"]
+        self._postings = state["postings"]
+        self._prefixes = state["prefixes"]
+        self._vocabulary = state["vocabulary"]
+        self._slots = {doc_id: slot for slot, doc_id in enumerate(self._ids) if doc_id is not None}
+        self._lengths = np.zeros((max(64, len(self._ids)), len(FIELDS)), dtype=np.float32)
+        self._lengths[:len(self._ids)] = state["lengths"]
+        self._length_sums = self._lengths.sum(axis=0, dtype=np.float64)
+        return state["extra"]
+
+    def stats(self) -> Dict[str, Any]:
+        count = len(self._slots)
+        posting_bytes = sum(
+            values.itemsize * len(values) for posting in self._postings.values() for values in posting
+        )
+        return {
+            "documents": count,
+            "terms": len(self._postings),
+            "postings": sum(len(posting[0]) for posting in self._postings.values()),
+            "posting_bytes": posting_bytes,
+            "prefixes": len(self._prefixes),
+            "vocabulary": self._vocabulary.stats(),
+            "avg_field_length": {
+                field: round(float(total) / count, 1) if count else 0.0
+                for field, total in zip(FIELDS, self._length_sums)
+            }
+        }
+
+
+def write_snapshot(path: str, data: Union[bytes, List[Any]]):
+    """Atomically replace the snapshot file with data or a list of buffers (safe to call from a worker thread)"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in [data] if isinstance(data, bytes) else data:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_snapshot(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
@@ -1,5 +1,5 @@
 from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Depends, Response, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -7,23 +7,47 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable
 import uuid
 from datetime import datetime, timezone, timedelta
-import pdfplumber
+import base64
 import asyncio
+import hashlib
+import json
+import time
+import aiofiles
+import aiofiles.os
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import CollectionInvalid
 from passlib.context import CryptContext
+from pdf_extraction import ExtractionEngine, EXTRACTION_VERSION, WorkerPool
+from job_queue import JobQueue, PermanentJobError
+from events import EventBroadcaster
+from file_serving import serve_file
+from cache import LRUCache
+from passwords import PasswordHasher, PasswordHasherBusy, LatencyRecorder
+from migrations import MigrationRunner, bulk_update
+from session_tokens import SessionTokenSigner, RevocationList, TOKEN_PREFIX
+from search_index import SearchIndex, read_snapshot, write_snapshot
+from trigram_index import max_typos
+from vector_index import EMBEDDING_VERSION, VectorIndex, embed, write_vectors
+from snippets import TEXT_VERSION, article_text_features, excerpt, text_features
+from text_analysis import ANALYZER_VERSION, analyze, analyze_article, analyze_articles, edge_ngrams, prefix_terms, tokenize
+from image_variants import VARIANT_WIDTHS, render_variants, probe as probe_image, snap_width, variant_format, variant_path, FORMATS as IMAGE_FORMATS
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware: dates come back as aware UTC datetimes and serialize with their offset
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
-# Password hashing
+# Password hashing (bcrypt runs in a bounded thread pool, see passwords.py)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(pwd_context)
+login_latency = LatencyRecorder()
 
 # Default admin credentials
 DEFAULT_ADMIN_EMAIL = "marc.hansen@canusa.de"
@@ -33,6 +57,90 @@ DEFAULT_ADMIN_NAME = "Marc Hansen"
 # Active editors tracking (in-memory, for production use Redis)
 active_editors = {}
 
+# PDF extraction runs in a process pool so large uploads don't block the event loop
+extraction_engine = ExtractionEngine()
+
+# Durable, bounded queue for background work (document processing)
+job_queue = JobQueue(db.jobs)
+
+# Document status/progress events, pushed to the browser via SSE
+document_events = EventBroadcaster(db.document_events, db.counters, name="document_events")
+SSE_HEARTBEAT_SECONDS = 15
+
+# Cross-worker cache invalidation: every process relays these and evicts locally
+cache_events = EventBroadcaster(db.cache_invalidations, db.counters, name="cache_invalidations")
+cache_invalidation_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+cache_listener_task: Optional[asyncio.Task] = None
+
+# Resolved sessions (token -> user) so authenticated requests normally don't touch the database
+session_cache = LRUCache(
+    int(os.environ.get("SESSION_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("SESSION_CACHE_TTL_SECONDS", "60"))
+)
+session_cache_generation = 0
+
+# Optional stateless sessions: with a signing key, tokens are HMAC-signed and validated without the database
+SESSION_SIGNING_KEY = os.environ.get("SESSION_SIGNING_KEY")
+session_signer = SessionTokenSigner(SESSION_SIGNING_KEY) if SESSION_SIGNING_KEY else None
+session_revocations = RevocationList()
+MAX_SESSION_DAYS = 30
+
+# Category id -> name, loaded in one query on first use and dropped on any category change
+category_names: Optional[Dict[str, str]] = None
+category_names_generation = 0
+category_names_loads = 0
+
+# Upload storage
+PDF_DIR = "/tmp/pdfs"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_PDF_UPLOAD_BYTES = int(os.environ.get("MAX_PDF_UPLOAD_MB", "100")) * 1024 * 1024
+IMAGE_DIR = "/tmp/images"
+MAX_IMAGE_UPLOAD_BYTES = 10 * 1024 * 1024
+
+# Image metadata never changes after upload, so hot images are served without a DB lookup
+image_meta_cache = LRUCache(int(os.environ.get("IMAGE_META_CACHE_SIZE", "2048")))
+
+# Resized/WebP image variants are rendered in their own small pool so they don't queue behind PDF extraction
+image_engine = WorkerPool(max_workers=int(os.environ.get("IMAGE_WORKERS", "2")))
+image_variant_tasks: Dict[str, asyncio.Future] = {}
+# Analysing a saved article's text (stemming, compounds, excerpt data) is pure-Python CPU work;
+# its own pool keeps it off the event loop without queueing behind PDF extraction
+text_engine = WorkerPool(max_workers=int(os.environ.get("TEXT_ANALYSIS_WORKERS", "1")))
+background_tasks: set = set()
+
+# Article search engine: "mongo" (text index) or "index" (in-process BM25F, see SEARCH INDEX)
+SEARCH_ENGINE = os.environ.get("SEARCH_ENGINE", "mongo")
+SEARCH_INDEX_PATH = os.environ.get("SEARCH_INDEX_PATH", "/tmp/search_index/articles.idx")
+SEARCH_INDEX_SNAPSHOT_SECONDS = int(os.environ.get("SEARCH_INDEX_SNAPSHOT_SECONDS", "300"))
+SEARCH_VECTORS_PATH = os.environ.get("SEARCH_VECTORS_PATH", "/tmp/search_index/articles.vec")
+# Share of the keyword score in hybrid ranking, the rest is vector similarity
+SEARCH_HYBRID_KEYWORD_WEIGHT = float(os.environ.get("SEARCH_HYBRID_KEYWORD_WEIGHT", "0.5"))
+# Time one query may spend looking for the words misspelt query terms were meant to be
+SEARCH_TYPO_BUDGET_MS = float(os.environ.get("SEARCH_TYPO_BUDGET_MS", "10"))
+# Bump the suffix when the metadata indexed with the articles changes
+ARTICLE_INDEX_VERSION = f"{ANALYZER_VERSION}/3"
+article_index = SearchIndex(version=ARTICLE_INDEX_VERSION)
+# Vectors are computed from the analyzed terms, so they change with the analyzer too
+ARTICLE_VECTORS_VERSION = f"{EMBEDDING_VERSION}/{ANALYZER_VERSION}"
+article_vectors = VectorIndex(version=ARTICLE_VECTORS_VERSION)
+article_index_ready = False
+article_index_dirty = False
+article_index_watermark: Optional[datetime] = None
+search_latency = LatencyRecorder()
+search_typo_corrections = 0
+
+# Results of repeated searches. Every article write anywhere bumps the corpus version, which
+# is part of the key, so results computed before a write are never served after it.
+search_cache = LRUCache(
+    int(os.environ.get("SEARCH_CACHE_SIZE", "1000")),
+    ttl=float(os.environ.get("SEARCH_CACHE_TTL_SECONDS", "300")),
+    sizeof=lambda results: len(json.dumps(results, default=str))
+)
+article_corpus_version = 0
+
+# Versioned, run-once schema/data migrations (see DATA MIGRATIONS)
+migration_runner = MigrationRunner(db.migrations)
+
 # Create the main app
 app = FastAPI(title="CANUSA Knowledge Hub API")
 
@@ -101,6 +209,7 @@ class Article(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     view_count: int = 0
+    word_count: int = 0
 
 class ArticleCreate(BaseModel):
     title: str
@@ -146,54 +255,202 @@ class SearchResult(BaseModel):
     score: float
     category_name: Optional[str] = None
 
+# ==================== CACHE INVALIDATION ====================
+
+def evict_sessions(data: Dict[str, Any]):
+    global session_cache_generation
+    # Lookups that started before this eviction must not put their (stale) result back
+    session_cache_generation += 1
+    if data.get("all"):
+        session_cache.clear()
+    if data.get("session_token"):
+        session_cache.pop(data["session_token"])
+    if data.get("user_id"):
+        session_cache.evict_where(lambda cached: cached[0].user_id == data["user_id"])
+        session_revocations.revoke_user(data["user_id"], data["at"])
+    if data.get("session_id"):
+        session_revocations.revoke_session(data["session_id"], data["expires_at"])
+    session_revocations.prune(MAX_SESSION_DAYS * 24 * 3600)
+
+cache_invalidation_handlers["session"] = evict_sessions
+
+async def invalidate_cache(kind: str, data: Dict[str, Any]):
+    """Evict from this worker's cache right away and tell the other workers to do the same"""
+    cache_invalidation_handlers[kind](data)
+    try:
+        await cache_events.publish(kind, data)
+    except Exception as e:
+        # Other workers still converge once their cache TTL runs out
+        logger.error(f"Could not publish {kind} cache invalidation: {e}")
+
+def clear_local_caches():
+    for handler in cache_invalidation_handlers.values():
+        handler({"all": True})
+
+async def listen_for_cache_invalidations(last_event_id: Optional[int] = None):
+    """Apply invalidations published by any worker (including this one) to the local caches"""
+    while True:
+        async with cache_events.subscribe(last_event_id) as queue:
+            last_event_id = None
+            while (event := await queue.get()) is not None:
+                if event.type == "reset":
+                    clear_local_caches()
+                    continue
+                handler = cache_invalidation_handlers.get(event.type)
+                try:
+                    if handler:
+                        handler(event.data)
+                except Exception as e:
+                    logger.error(f"Applying {event.type} cache invalidation failed: {e}")
+        # Dropped for falling behind: we may have missed evictions, so start over empty
+        logger.warning("Cache invalidation listener fell behind, clearing local caches")
+        clear_local_caches()
+
 # ==================== AUTH HELPERS ====================
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def password_hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Zu viele gleichzeitige Anmeldungen. Bitte versuchen Sie es in wenigen Sekunden erneut.",
+        headers={"Retry-After": "5"}
+    )
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
 
-async def get_current_user(request: Request) -> User:
-    """Get user from session token in cookie or Authorization header"""
+async def get_password_hash(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
+
+def get_session_token(request: Request) -> Optional[str]:
     session_token = request.cookies.get("session_token")
-    
     if not session_token:
         auth_header = request.headers.get("Authorization")
         if auth_header and auth_header.startswith("Bearer "):
             session_token = auth_header[7:]
+    return session_token
+
+async def resolve_session(session_token: str) -> Optional[Dict[str, Any]]:
+    """Session and its user in one round trip: {"expires_at", "user"}, or None.
+    
+    Expired sessions, sessions of deleted users and of blocked users are filtered
+    out by the query itself.
+    """
+    now = datetime.now(timezone.utc)
+    pipeline = [
+        {"$match": {
+            "session_token": session_token,
+            # A date; sessions not yet reached by the timestamp migration hold an ISO string
+            "$or": [{"expires_at": {"$gt": now.isoformat()}}, {"expires_at": {"$gt": now}}]
+        }},
+        {"$limit": 1},
+        {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "user_id", "as": "user"}},
+        {"$unwind": "$user"},
+        {"$match": {"user.is_blocked": {"$ne": True}}},
+        {"$project": {
+            "_id": 0,
+            "expires_at": 1,
+            **{f"user.{field}": 1 for field in User.model_fields}
+        }}
+    ]
+    async for session in db.user_sessions.aggregate(pipeline):
+        return session
+    return None
+
+async def revoke_sessions(session_token: Optional[str] = None, user_id: Optional[str] = None):
+    """Make a session (logout) or all sessions of a user (role/password/block/delete) take effect on every worker"""
+    data = {"at": time.time()}
+    if session_token:
+        data["session_token"] = session_token
+        payload = session_signer.verify(session_token) if session_signer else None
+        if payload:
+            data["session_id"] = payload["sid"]
+            data["expires_at"] = payload["exp"]
+            await db.session_revocations.insert_one({
+                "session_id": payload["sid"],
+                "expires_at": datetime.fromtimestamp(payload["exp"], timezone.utc)
+            })
+    if user_id:
+        data["user_id"] = user_id
+        if session_signer:
+            # Replaces the previous marker of this user; kept as long as a token could live
+            await db.session_revocations.update_one(
+                {"user_id": user_id},
+                {"$set": {
+                    "not_before": data["at"],
+                    "expires_at": datetime.now(timezone.utc) + timedelta(days=MAX_SESSION_DAYS)
+                }},
+                upsert=True
+            )
+    await invalidate_cache("session", data)
+
+async def load_session_revocations():
+    if not session_signer:
+        return
+    rows = await db.session_revocations.find(
+        {"expires_at": {"$gt": datetime.now(timezone.utc)}},
+        {"_id": 0}
+    ).to_list(None)
+    session_revocations.load(rows)
+
+def user_from_token(session_token: str) -> Optional[User]:
+    """User of a signed token that can be trusted without the database, or None"""
+    payload = session_signer.verify(session_token)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Sitzung ungültig oder abgelaufen")
+    if session_revocations.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Sitzung ungültig oder abgelaufen")
+    if session_revocations.is_stale(payload):
+        # The user changed after the token was issued; the database has the current state
+        return None
+    return User(
+        user_id=payload["uid"],
+        email=payload["email"],
+        name=payload["name"],
+        role=payload["role"],
+        **({"created_at": payload["created"]} if payload.get("created") else {})
+    )
+
+async def get_current_user(request: Request) -> User:
+    """Get user from session token in cookie or Authorization header"""
+    session_token = get_session_token(request)
     
     if not session_token:
         raise HTTPException(status_code=401, detail="Nicht authentifiziert")
     
-    session = await db.user_sessions.find_one(
-        {"session_token": session_token},
-        {"_id": 0}
-    )
+    if session_signer and session_token.startswith(TOKEN_PREFIX):
+        user = user_from_token(session_token)
+        if user is not None:
+            return user
+    
+    cached = session_cache.get(session_token)
+    if cached is not None:
+        user, expires_at = cached
+        if expires_at >= datetime.now(timezone.utc):
+            return user
+        session_cache.pop(session_token)
+    
+    generation = session_cache_generation
+    session = await resolve_session(session_token)
     
     if not session:
-        raise HTTPException(status_code=401, detail="Sitzung nicht gefunden")
+        raise HTTPException(status_code=401, detail="Sitzung ungültig oder abgelaufen")
     
-    expires_at = session.get("expires_at")
+    expires_at = session["expires_at"]
     if isinstance(expires_at, str):
         expires_at = datetime.fromisoformat(expires_at)
     if expires_at.tzinfo is None:
         expires_at = expires_at.replace(tzinfo=timezone.utc)
-    if expires_at < datetime.now(timezone.utc):
-        raise HTTPException(status_code=401, detail="Sitzung abgelaufen")
-    
-    user = await db.users.find_one(
-        {"user_id": session["user_id"]},
-        {"_id": 0}
-    )
-    
-    if not user:
-        raise HTTPException(status_code=401, detail="Benutzer nicht gefunden")
-    
-    if user.get("is_blocked", False):
-        raise HTTPException(status_code=403, detail="Ihr Konto wurde gesperrt. Bitte kontaktieren Sie einen Administrator.")
     
-    return User(**user)
+    user = User(**session["user"])
+    if generation == session_cache_generation:
+        session_cache.set(session_token, (user, expires_at))
+    return user
 
 async def get_optional_user(request: Request) -> Optional[User]:
     try:
@@ -217,31 +474,45 @@ class UserCreate(BaseModel):
 class PasswordChange(BaseModel):
     new_password: str
 
-@api_router.post("/auth/login")
-async def login(login_data: LoginRequest, response: Response):
-    """Login with email and password"""
+async def authenticate(login_data: LoginRequest) -> Dict[str, Any]:
+    """Check the credentials and return the user document"""
     user = await db.users.find_one({"email": login_data.email.lower()}, {"_id": 0})
     
     if not user:
         raise HTTPException(status_code=401, detail="Ungültige E-Mail oder Passwort")
     
-    if not verify_password(login_data.password, user.get("password_hash", "")):
+    if not await verify_password(login_data.password, user.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Ungültige E-Mail oder Passwort")
     
     if user.get("is_blocked", False):
         raise HTTPException(status_code=403, detail="Ihr Konto wurde gesperrt")
     
+    return user
+
+@api_router.post("/auth/login")
+async def login(login_data: LoginRequest, response: Response):
+    """Login with email and password"""
+    started = time.perf_counter()
+    try:
+        user = await authenticate(login_data)
+    finally:
+        login_latency.record(time.perf_counter() - started)
+    
     # Create session
-    session_token = str(uuid.uuid4())
-    days = 30 if login_data.stay_logged_in else 7
+    session_id = str(uuid.uuid4())
+    days = MAX_SESSION_DAYS if login_data.stay_logged_in else 7
     expires_at = datetime.now(timezone.utc) + timedelta(days=days)
+    if session_signer:
+        session_token = session_signer.issue(user, session_id, expires_at.timestamp())
+    else:
+        session_token = str(uuid.uuid4())
     
     session_doc = {
-        "session_id": str(uuid.uuid4()),
+        "session_id": session_id,
         "user_id": user["user_id"],
         "session_token": session_token,
-        "expires_at": expires_at.isoformat(),
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "expires_at": expires_at,
+        "created_at": datetime.now(timezone.utc)
     }
     await db.user_sessions.insert_one(session_doc)
     
@@ -276,6 +547,7 @@ async def logout(request: Request, response: Response):
     session_token = request.cookies.get("session_token")
     if session_token:
         await db.user_sessions.delete_one({"session_token": session_token})
+        await revoke_sessions(session_token=session_token)
     
     response.delete_cookie(key="session_token", path="/")
     return {"message": "Erfolgreich abgemeldet"}
@@ -320,11 +592,11 @@ async def create_user(user_data: UserCreate, current_user: User = Depends(get_cu
         "user_id": user_id,
         "email": user_data.email.lower(),
         "name": user_data.name,
-        "password_hash": get_password_hash(user_data.password),
+        "password_hash": await get_password_hash(user_data.password),
         "role": user_data.role,
         "is_blocked": False,
         "recently_viewed": [],
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     await db.users.insert_one(new_user)
     
@@ -350,12 +622,14 @@ async def update_user_role(user_id: str, role_update: RoleUpdate, current_user:
     
     result = await db.users.update_one(
         {"user_id": user_id},
-        {"$set": {"role": role_update.role, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"role": role_update.role, "updated_at": datetime.now(timezone.utc)}}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
     
+    await revoke_sessions(user_id=user_id)
+    
     return {"message": f"Rolle auf {role_update.role} geändert"}
 
 @api_router.put("/users/{user_id}/password")
@@ -370,8 +644,8 @@ async def change_user_password(user_id: str, password_data: PasswordChange, curr
     result = await db.users.update_one(
         {"user_id": user_id},
         {"$set": {
-            "password_hash": get_password_hash(password_data.new_password),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "password_hash": await get_password_hash(password_data.new_password),
+            "updated_at": datetime.now(timezone.utc)
         }}
     )
     
@@ -380,6 +654,7 @@ async def change_user_password(user_id: str, password_data: PasswordChange, curr
     
     # Invalidate all sessions for this user
     await db.user_sessions.delete_many({"user_id": user_id})
+    await revoke_sessions(user_id=user_id)
     
     return {"message": "Passwort erfolgreich geändert"}
 
@@ -405,6 +680,7 @@ async def toggle_user_block(user_id: str, current_user: User = Depends(get_curre
     
     if new_status:
         await db.user_sessions.delete_many({"user_id": user_id})
+    await revoke_sessions(user_id=user_id)
     
     return {
         "message": f"Benutzer {'gesperrt' if new_status else 'entsperrt'}",
@@ -426,11 +702,41 @@ async def delete_user(user_id: str, current_user: User = Depends(get_current_use
     
     await db.user_sessions.delete_many({"user_id": user_id})
     await db.users.delete_one({"user_id": user_id})
+    await revoke_sessions(user_id=user_id)
     
     return {"message": "Benutzer gelöscht"}
 
 # ==================== CATEGORY ENDPOINTS ====================
 
+def evict_category_names(data: Dict[str, Any]):
+    global category_names, category_names_generation
+    # A load that started before this change must not store what it read
+    category_names_generation += 1
+    category_names = None
+
+cache_invalidation_handlers["categories"] = evict_category_names
+
+async def get_category_names() -> Dict[str, str]:
+    global category_names, category_names_loads
+    names = category_names
+    if names is None:
+        generation = category_names_generation
+        names = {
+            cat["category_id"]: cat["name"]
+            async for cat in db.categories.find({}, {"_id": 0, "category_id": 1, "name": 1})
+        }
+        category_names_loads += 1
+        if generation == category_names_generation:
+            category_names = names
+    return names
+
+async def add_category_names(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Set category_name on every article (None without or with an unknown category)"""
+    names = await get_category_names()
+    for art in articles:
+        art["category_name"] = names.get(art.get("category_id"))
+    return articles
+
 @api_router.get("/categories", response_model=List[Dict])
 async def get_categories(user: User = Depends(get_current_user)):
     """Get all categories as a tree structure"""
@@ -448,9 +754,8 @@ async def create_category(category: CategoryCreate, user: User = Depends(get_cur
         created_by=user.user_id
     )
     doc = cat_doc.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
-    doc["updated_at"] = doc["updated_at"].isoformat()
     await db.categories.insert_one(doc)
+    await invalidate_cache("categories", {"category_id": doc["category_id"]})
     return {k: v for k, v in doc.items() if k != "_id"}
 
 @api_router.put("/categories/{category_id}", response_model=Dict)
@@ -463,11 +768,12 @@ async def update_category(category_id: str, update: CategoryCreate, user: User =
             "parent_id": update.parent_id,
             "description": update.description,
             "order": update.order,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Kategorie nicht gefunden")
+    await invalidate_cache("categories", {"category_id": category_id})
     
     cat = await db.categories.find_one({"category_id": category_id}, {"_id": 0})
     return cat
@@ -478,10 +784,14 @@ async def delete_category(category_id: str, user: User = Depends(get_current_use
     result = await db.categories.delete_one({"category_id": category_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Kategorie nicht gefunden")
+    await invalidate_cache("categories", {"category_id": category_id})
     return {"message": "Kategorie gelöscht"}
 
 # ==================== ARTICLE ENDPOINTS ====================
 
+# Derived fields for autocomplete and search (see SEARCH), clients never need them
+ARTICLE_PROJECTION = {"_id": 0, "title_prefixes": 0, "search": 0, "text": 0}
+
 @api_router.get("/articles", response_model=List[Dict])
 async def get_articles(
     status: Optional[str] = None,
@@ -495,28 +805,28 @@ async def get_articles(
     if category_id:
         query["category_id"] = category_id
     
-    articles = await db.articles.find(query, {"_id": 0}).sort("updated_at", -1).to_list(1000)
-    return articles
+    articles = await db.articles.find(query, ARTICLE_PROJECTION).sort("updated_at", -1).to_list(1000)
+    return await add_category_names(articles)
 
 @api_router.get("/articles/top-viewed")
 async def get_top_viewed_articles(limit: int = 10, user: User = Depends(get_current_user)):
     """Get top viewed articles system-wide"""
-    articles = await db.articles.find({}, {"_id": 0}).sort("view_count", -1).limit(limit).to_list(limit)
-    return articles
+    articles = await db.articles.find({}, ARTICLE_PROJECTION).sort("view_count", -1).limit(limit).to_list(limit)
+    return await add_category_names(articles)
 
 @api_router.get("/articles/by-category/{category_id}")
 async def get_articles_by_category(category_id: str, user: User = Depends(get_current_user)):
     """Get articles in a specific category"""
     articles = await db.articles.find(
         {"category_id": category_id},
-        {"_id": 0}
+        ARTICLE_PROJECTION
     ).sort("updated_at", -1).to_list(100)
-    return articles
+    return await add_category_names(articles)
 
 @api_router.get("/articles/{article_id}", response_model=Dict)
 async def get_article(article_id: str, user: User = Depends(get_current_user)):
     """Get a single article"""
-    article = await db.articles.find_one({"article_id": article_id}, {"_id": 0})
+    article = await db.articles.find_one({"article_id": article_id}, ARTICLE_PROJECTION)
     if not article:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
     return article
@@ -524,6 +834,10 @@ async def get_article(article_id: str, user: User = Depends(get_current_user)):
 @api_router.post("/articles", response_model=Dict)
 async def create_article(article: ArticleCreate, user: User = Depends(get_current_user)):
     """Create a new article"""
+    features, search = await asyncio.gather(
+        text_engine.run(text_features, article.content),
+        text_engine.run(analyze_article, article.model_dump())
+    )
     art_doc = Article(
         title=article.title,
         content=article.content,
@@ -533,37 +847,49 @@ async def create_article(article: ArticleCreate, user: User = Depends(get_curren
         visibility=article.visibility,
         tags=article.tags,
         created_by=user.user_id,
-        updated_by=user.user_id
+        updated_by=user.user_id,
+        word_count=features["word_count"]
     )
     doc = art_doc.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
-    doc["updated_at"] = doc["updated_at"].isoformat()
-    if doc.get("review_date"):
-        doc["review_date"] = doc["review_date"].isoformat()
     
-    await db.articles.insert_one(doc)
-    return {k: v for k, v in doc.items() if k != "_id"}
+    await db.articles.insert_one({
+        **doc,
+        "title_prefixes": edge_ngrams(doc["title"]),
+        "search": search,
+        "text": features["text"]
+    })
+    await article_changed(doc["article_id"], {**doc, "search": search})
+    return doc
 
 @api_router.put("/articles/{article_id}", response_model=Dict)
 async def update_article(article_id: str, update: ArticleUpdate, user: User = Depends(get_current_user)):
     """Update an article"""
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
     update_data["updated_by"] = user.user_id
-    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-    
-    if update_data.get("review_date"):
-        update_data["review_date"] = update_data["review_date"].isoformat()
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    if "title" in update_data:
+        update_data["title_prefixes"] = edge_ngrams(update_data["title"])
+    if "content" in update_data:
+        update_data.update(await text_engine.run(text_features, update_data["content"]))
     
-    result = await db.articles.update_one(
+    article = await db.articles.find_one_and_update(
         {"article_id": article_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={"_id": 0, "title_prefixes": 0, "text": 0},
+        return_document=ReturnDocument.AFTER
     )
-    
-    if result.matched_count == 0:
+    if not article:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
     
-    article = await db.articles.find_one({"article_id": article_id}, {"_id": 0})
-    return article
+    if any(field in update_data for field in ARTICLE_TEXT_WEIGHTS):
+        article["search"] = await text_engine.run(analyze_article, article)
+        # Only if no newer save came in between; that one stores its own terms
+        await db.articles.update_one(
+            {"article_id": article_id, "updated_at": article["updated_at"]},
+            {"$set": {"search": article["search"]}}
+        )
+    await article_changed(article_id, article)
+    return {k: v for k, v in article.items() if k != "search"}
 
 @api_router.delete("/articles/{article_id}")
 async def delete_article(article_id: str, user: User = Depends(get_current_user)):
@@ -571,99 +897,424 @@ async def delete_article(article_id: str, user: User = Depends(get_current_user)
     result = await db.articles.delete_one({"article_id": article_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
+    await article_changed(article_id)
     return {"message": "Artikel gelöscht"}
 
+# ==================== SEARCH INDEX ====================
+# With SEARCH_ENGINE=index every worker keeps all articles in an in-process BM25F index
+# (search_index.py) and their vectors for semantic search (vector_index.py). The article
+# endpoints update both directly and publish an "article" invalidation so the other
+# workers re-read the article; snapshots on disk make restarts warm instead of
+# re-tokenising the whole corpus.
+
+ARTICLE_INDEX_PROJECTION = {
+    "_id": 0, "article_id": 1, "title": 1, "search": 1, "category_id": 1, "status": 1, "tags": 1,
+    "view_count": 1, "updated_at": 1
+}
+
+def use_article_index() -> bool:
+    # Until the index is loaded, searches keep using MongoDB
+    return SEARCH_ENGINE == "index" and article_index_ready
+
+def as_timestamp(value: Any) -> Optional[datetime]:
+    return parse_timestamp(value) if isinstance(value, str) else value
+
+def index_article(article: Dict[str, Any]):
+    global article_index_dirty, article_index_watermark
+    updated_at = as_timestamp(article.get("updated_at"))
+    # The terms were analyzed when the article was saved
+    terms = {field: article["search"][field].split() for field in ARTICLE_TEXT_WEIGHTS}
+    article_index.add(
+        article["article_id"],
+        terms,
+        {
+            "category_id": article.get("category_id"),
+            "status": article.get("status", "draft"),
+            "tags": article.get("tags") or [],
+            "view_count": article.get("view_count", 0),
+            "updated_at": updated_at
+        },
+        # Same prefixes as the stored title_prefixes, for autocomplete
+        prefixes=edge_ngrams(article.get("title") or "")
+    )
+    article_vectors.add(article["article_id"], embed(terms))
+    article_index_dirty = True
+    if updated_at and (article_index_watermark is None or updated_at > article_index_watermark):
+        article_index_watermark = updated_at
+
+def unindex_article(article_id: str):
+    global article_index_dirty
+    if article_index.remove(article_id) | article_vectors.remove(article_id):
+        article_index_dirty = True
+
+async def reindex_article(article_id: str):
+    article = await db.articles.find_one({"article_id": article_id}, ARTICLE_INDEX_PROJECTION)
+    if article:
+        index_article(article)
+    else:
+        unindex_article(article_id)
+
+async def article_changed(article_id: str, article: Optional[Dict[str, Any]] = None):
+    """Update search caches and index of every worker after an article was saved (or deleted: article=None)"""
+    if SEARCH_ENGINE == "index":
+        if article:
+            index_article(article)
+        else:
+            unindex_article(article_id)
+    # As a string: a BSON date in the event would lose the microseconds and never match
+    updated_at = as_timestamp(article.get("updated_at")) if article else None
+    await invalidate_cache("article", {
+        "article_id": article_id,
+        "updated_at": updated_at.isoformat() if updated_at else None
+    })
+
+def on_article_invalidation(data: Dict[str, Any]):
+    global article_corpus_version
+    article_corpus_version += 1
+    search_cache.clear()
+    if SEARCH_ENGINE != "index":
+        return
+    if data.get("all"):
+        run_in_background(refresh_article_index())
+        return
+    if not data.get("updated_at"):
+        unindex_article(data["article_id"])
+        return
+    meta = article_index.meta(data["article_id"])
+    # Already indexed in this version (our own change) - nothing to re-read
+    if meta is None or meta["updated_at"] != parse_timestamp(data["updated_at"]):
+        run_in_background(reindex_article(data["article_id"]))
+
+cache_invalidation_handlers["article"] = on_article_invalidation
+
+async def refresh_article_index() -> int:
+    """Re-index articles changed since the watermark and drop deleted ones; returns the number re-read"""
+    # Margin for clock skew between workers writing updated_at
+    since = article_index_watermark - timedelta(minutes=5) if article_index_watermark else None
+    indexed = 0
+    async for article in db.articles.find({"updated_at": {"$gte": since}} if since else {}, ARTICLE_INDEX_PROJECTION):
+        index_article(article)
+        indexed += 1
+        if indexed % 200 == 0:
+            # Tokenising is CPU work; let requests through while (re)building
+            await asyncio.sleep(0)
+    # Captured before listing: articles created meanwhile must not look deleted
+    known = set(article_index.ids()) | set(article_vectors.ids())
+    existing = {row["article_id"] async for row in db.articles.find({}, {"_id": 0, "article_id": 1})}
+    for article_id in known - existing:
+        unindex_article(article_id)
+    return indexed
+
+def restore_article_index(index_path: str, vectors_path: str) -> tuple:
+    index = SearchIndex(version=ARTICLE_INDEX_VERSION)
+    watermark = index.restore(read_snapshot(index_path))["watermark"]
+    vectors = VectorIndex(version=ARTICLE_VECTORS_VERSION)
+    vectors_watermark = as_timestamp(vectors.load(vectors_path)["watermark"])
+    # Catch up from the older of the two (a crash may have come between writing them)
+    if watermark is None or vectors_watermark is None:
+        return index, vectors, None
+    return index, vectors, min(watermark, vectors_watermark)
+
+async def load_article_index():
+    """Warm start from the snapshot (or build from scratch), then catch up with the database"""
+    global article_index, article_vectors, article_index_ready, article_index_watermark
+    # The index is built from the terms stored with the articles (migration 6)
+    while await migration_runner.pending():
+        await asyncio.sleep(1)
+    started = time.perf_counter()
+    source = "snapshot"
+    try:
+        # Unpickling a large index takes a while; do it off the loop into a fresh object
+        restored = await asyncio.to_thread(restore_article_index, SEARCH_INDEX_PATH, SEARCH_VECTORS_PATH)
+        article_index, article_vectors, article_index_watermark = restored
+    except FileNotFoundError:
+        source = "database"
+    except Exception as e:
+        logger.warning(f"Search index snapshot not usable, rebuilding: {e}")
+        source = "database"
+    while True:
+        try:
+            updated = await refresh_article_index()
+            break
+        except Exception as e:
+            logger.error(f"Loading the search index failed: {e}")
+            await asyncio.sleep(10)
+    article_index_ready = True
+    logger.info(
+        f"Search index ready from {source}: {len(article_index)} articles, "
+        f"{updated} read from the database, {time.perf_counter() - started:.1f}s"
+    )
+
+async def save_article_index():
+    global article_index_dirty
+    # Serialised on the loop so the snapshot is consistent; only the write goes to a thread
+    data = article_index.snapshot({"watermark": article_index_watermark})
+    vectors = article_vectors.snapshot({
+        "watermark": article_index_watermark.isoformat() if article_index_watermark else None
+    })
+    vector_index = article_vectors
+    article_index_dirty = False
+    await asyncio.to_thread(write_snapshot, SEARCH_INDEX_PATH, data)
+    await asyncio.to_thread(write_vectors, SEARCH_VECTORS_PATH, vectors)
+    # Serve the written rows from the mapped file; otherwise everything added since startup
+    # stays in the in-memory overlay, which is re-stacked for every query after a change
+    try:
+        vector_index.remap(SEARCH_VECTORS_PATH, vectors)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not map the written search vectors: {e}")
+
+async def snapshot_article_index_periodically():
+    while True:
+        await asyncio.sleep(SEARCH_INDEX_SNAPSHOT_SECONDS)
+        if article_index_ready and article_index_dirty:
+            try:
+                await save_article_index()
+            except Exception as e:
+                logger.error(f"Writing the search index snapshot failed: {e}")
+
+async def find_articles_by_id(article_ids: List[str], projection: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Articles in the order given; ids no longer in the database are skipped"""
+    if not article_ids:
+        return []
+    rows = await db.articles.find({"article_id": {"$in": article_ids}}, projection).to_list(len(article_ids))
+    by_id = {row["article_id"]: row for row in rows}
+    return [by_id[article_id] for article_id in article_ids if article_id in by_id]
+
+# A misspelt term is in no article; up to this many close terms are searched instead
+MAX_TYPO_ALTERNATIVES = 3
+
+def correct_typos(terms: List[str]) -> List[str]:
+    """Terms with the ones no article contains replaced by the closest indexed terms"""
+    global search_typo_corrections
+    deadline = time.perf_counter() + SEARCH_TYPO_BUDGET_MS / 1000
+    corrected = []
+    for term in terms:
+        if article_index.has_term(term) or not max_typos(term):
+            corrected.append(term)
+            continue
+        alternatives = article_index.similar_terms(term, max_typos(term), deadline)[:MAX_TYPO_ALTERNATIVES]
+        if alternatives:
+            search_typo_corrections += 1
+        corrected.extend(alternatives or [term])
+    return corrected
+
+def keyword_hits(terms: List[str], limit: int, where: Optional[Callable] = None) -> List[tuple]:
+    hits = article_index.search(terms, limit, where)
+    # BM25 scores are unbounded; report them relative to the best hit
+    best = hits[0][1] if hits else 1.0
+    return [(article_id, score / best) for article_id, score in hits]
+
+def vector_hits(terms: List[str], limit: int, where: Optional[Callable] = None) -> List[tuple]:
+    """Articles by cosine similarity of their vectors to the query's"""
+    accept = (lambda article_id: where(article_index.meta(article_id))) if where else None
+    return article_vectors.search(embed({"title": terms}), limit, accept)
+
+# Candidates taken from each ranking for hybrid search, per result wanted
+HYBRID_CANDIDATES = 3
+
+def hybrid_hits(terms: List[str], limit: int, where: Optional[Callable] = None) -> List[tuple]:
+    """Keyword and vector hits merged by the weighted sum of their scores"""
+    scores: Dict[str, float] = {}
+    for article_id, score in keyword_hits(terms, limit * HYBRID_CANDIDATES, where):
+        scores[article_id] = SEARCH_HYBRID_KEYWORD_WEIGHT * score
+    for article_id, score in vector_hits(terms, limit * HYBRID_CANDIDATES, where):
+        scores[article_id] = scores.get(article_id, 0.0) + (1 - SEARCH_HYBRID_KEYWORD_WEIGHT) * score
+    return sorted(scores.items(), key=lambda hit: hit[1], reverse=True)[:limit]
+
+async def search_article_index(
+    terms: List[str],
+    limit: int,
+    projection: Dict[str, Any],
+    where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    mode: str = "keyword"
+) -> List[Dict[str, Any]]:
+    """Articles for (typo corrected) terms, best first, with their score relative to the best hit"""
+    if mode == "semantic":
+        hits = vector_hits(terms, limit, where)
+    elif mode == "hybrid":
+        hits = hybrid_hits(terms, limit, where)
+    else:
+        hits = keyword_hits(terms, limit, where)
+    articles = await find_articles_by_id([article_id for article_id, _ in hits], projection)
+    scores = dict(hits)
+    for art in articles:
+        art["score"] = round(scores[art["article_id"]], 4)
+    return articles
+
 # ==================== SEARCH ====================
 
+SEARCH_MAX_RESULTS = 100
+
 class SearchQuery(BaseModel):
     query: str
+    # Capped at SEARCH_MAX_RESULTS
     top_k: int = 10
+    # Drill-down: results and facet counts are limited to these
     category_id: Optional[str] = None
+    status: Optional[str] = None
+    tag: Optional[str] = None
+
+# Field weights of the articles text index. Since migration 6 it indexes the terms our own
+# analyzer stored in article.search, so MongoDB must not stem again (language "none").
+ARTICLE_TEXT_WEIGHTS = {"title": 10, "summary": 5, "tags": 3, "content": 1}
+ARTICLE_TEXT_LANGUAGE = "german"
+
+# Search results show an excerpt from the precomputed article.text instead of the content
+SEARCH_RESULT_PROJECTION = {
+    "_id": 0, "article_id": 1, "title": 1, "summary": 1, "category_id": 1, "status": 1, "updated_at": 1, "text": 1
+}
+
+async def search_articles_mongo(
+    terms: List[str],
+    limit: int,
+    filters: Dict[str, Any],
+    projection: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """Weighted $text search over the stored search terms, best matches first"""
+    articles = await db.articles.find(
+        {"$text": {"$search": " ".join(terms), "$language": "none"}, **filters},
+        {**projection, "score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+    # textScore is unbounded; report it relative to the best hit
+    best = articles[0]["score"] if articles else 1.0
+    for art in articles:
+        art["score"] = round(art["score"] / best, 4)
+    return articles
+
+# Article fields the search counts matches by, and the values reported per field
+FACET_FIELDS = ("category_id", "status", "tags")
+MAX_FACET_VALUES = 20
+
+def top_facet_values(counts: Dict[Any, int]) -> List[tuple]:
+    return sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))[:MAX_FACET_VALUES]
+
+async def facet_search_mongo(
+    terms: List[str],
+    limit: int,
+    filters: Dict[str, Any],
+    projection: Dict[str, Any]
+) -> tuple:
+    """search_articles_mongo plus the facet counts of all matches, in one aggregation.
+    
+    The $facet result is a single document (16 MB at most), so the hits in it are only
+    ids and scores; the articles are loaded by id afterwards.
+    """
+    def count_by(field: str) -> List[Dict[str, Any]]:
+        return [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": MAX_FACET_VALUES}
+        ]
+    
+    [result] = await db.articles.aggregate([
+        {"$match": {"$text": {"$search": " ".join(terms), "$language": "none"}, **filters}},
+        # Only what the hits and facets need travels through the pipeline
+        {"$project": {
+            "_id": 0, "article_id": 1, "category_id": 1, "status": 1, "tags": 1, "score": {"$meta": "textScore"}
+        }},
+        {"$facet": {
+            "hits": [{"$sort": {"score": -1}}, {"$limit": limit}, {"$project": {"article_id": 1, "score": 1}}],
+            "category_id": count_by("category_id"),
+            "status": count_by("status"),
+            "tags": [{"$unwind": "$tags"}, *count_by("tags")]
+        }}
+    ]).to_list(1)
+    hits = result["hits"]
+    # textScore is unbounded; report it relative to the best hit
+    best = hits[0]["score"] if hits else 1.0
+    scores = {hit["article_id"]: round(hit["score"] / best, 4) for hit in hits}
+    articles = await find_articles_by_id(list(scores), projection)
+    for art in articles:
+        art["score"] = scores[art["article_id"]]
+    facets = {field: [(row["_id"], row["count"]) for row in result[field]] for field in FACET_FIELDS}
+    return articles, facets
+
+def facets_response(facets: Dict[str, List[tuple]], names: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+    return {
+        "category": [
+            {"value": value, "name": names.get(value), "count": count} for value, count in facets.get("category_id", [])
+        ],
+        "status": [{"value": value, "count": count} for value, count in facets.get("status", [])],
+        "tags": [{"value": value, "count": count} for value, count in facets.get("tags", [])]
+    }
+
+# keyword: full-text ranking; semantic: vector similarity; hybrid: both merged
+SEARCH_MODES = ("keyword", "semantic", "hybrid")
 
 @api_router.post("/search")
-async def search_articles(query: SearchQuery, user: User = Depends(get_current_user)):
-    """Search articles with keyword matching"""
+async def search_articles(query: SearchQuery, mode: str = "keyword", user: User = Depends(get_current_user)):
+    """Search articles using the weighted full-text index (or the BM25F index), best matches first.
+    
+    facets counts all articles containing a query term (within the drill-down filters) by
+    category, status and tag, whatever the mode.
+    """
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail="Unbekannter Suchmodus")
     if not query.query or len(query.query) < 2:
-        return {"results": [], "query": query.query}
-    
-    # Build MongoDB query for text search
-    search_terms = query.query.lower().split()
-    
-    # Search in title, content, summary, and tags
-    or_conditions = []
-    for term in search_terms:
-        or_conditions.extend([
-            {"title": {"$regex": term, "$options": "i"}},
-            {"content": {"$regex": term, "$options": "i"}},
-            {"summary": {"$regex": term, "$options": "i"}},
-            {"tags": {"$regex": term, "$options": "i"}}
-        ])
-    
-    mongo_query = {"$or": or_conditions}
-    
-    if query.category_id:
-        mongo_query["category_id"] = query.category_id
-    
-    articles = await db.articles.find(mongo_query, {"_id": 0}).limit(query.top_k * 2).to_list(query.top_k * 2)
-    
-    # Score and rank results
-    results = []
-    for art in articles:
-        title_lower = art["title"].lower()
-        content_lower = art.get("content", "").lower()
-        summary_lower = art.get("summary", "").lower()
-        
-        # Calculate relevance score
-        score = 0
-        for term in search_terms:
-            if term in title_lower:
-                score += 0.4  # Title matches are most important
-            if term in summary_lower:
-                score += 0.2
-            if term in content_lower:
-                score += 0.1
-        
-        if score == 0:
-            continue
-        
-        # Find snippet
-        snippet = art.get("summary", "")
-        if not snippet:
-            content = art.get("content", "")
-            # Strip HTML tags for snippet
-            import re
-            clean_content = re.sub(r'<[^>]+>', '', content)
-            for term in search_terms:
-                idx = clean_content.lower().find(term)
-                if idx >= 0:
-                    start = max(0, idx - 50)
-                    end = min(len(clean_content), idx + 150)
-                    snippet = "..." + clean_content[start:end].strip() + "..."
-                    break
-            if not snippet:
-                snippet = clean_content[:200] + "..." if len(clean_content) > 200 else clean_content
-        
-        # Get category name
-        category_name = None
-        if art.get("category_id"):
-            cat = await db.categories.find_one({"category_id": art["category_id"]}, {"_id": 0, "name": 1})
-            if cat:
-                category_name = cat["name"]
-        
-        results.append({
-            "article_id": art["article_id"],
-            "title": art["title"],
-            "content_snippet": snippet[:300],
-            "score": min(score, 1.0),
-            "category_name": category_name,
-            "status": art.get("status", "draft"),
-            "updated_at": art.get("updated_at")
-        })
-    
-    # Sort by score
-    results.sort(key=lambda x: x["score"], reverse=True)
-    
-    return {"results": results[:query.top_k], "query": query.query}
+        return {"results": [], "query": query.query, "mode": mode, "facets": facets_response({}, {})}
+    
+    started = time.perf_counter()
+    terms = analyze(query.query)
+    if not terms:
+        # Nothing but stop words
+        return {"results": [], "query": query.query, "mode": mode, "facets": facets_response({}, {})}
+    
+    if not use_article_index():
+        # Vectors are only kept with SEARCH_ENGINE=index (and once it is loaded)
+        mode = "keyword"
+    limit = min(query.top_k, SEARCH_MAX_RESULTS)
+    filters = {
+        field: value
+        for field, value in (("category_id", query.category_id), ("status", query.status), ("tags", query.tag))
+        if value
+    }
+    # Case, punctuation and spacing of the query don't change the results
+    key = ("internal", article_corpus_version, use_article_index(), mode, tuple(tokenize(query.query)),
+           tuple(sorted(filters.items())), limit)
+    cached = search_cache.get(key)
+    if cached is None:
+        if use_article_index():
+            terms = correct_typos(terms)
+            where = None
+            if filters:
+                def where(meta):
+                    return all(
+                        value in meta["tags"] if field == "tags" else meta[field] == value
+                        for field, value in filters.items()
+                    )
+            articles = await search_article_index(terms, limit, SEARCH_RESULT_PROJECTION, where, mode)
+            counts = article_index.facets(terms, FACET_FIELDS, where)
+            facets = {field: top_facet_values(counts[field]) for field in FACET_FIELDS}
+        else:
+            articles, facets = await facet_search_mongo(terms, limit, filters, SEARCH_RESULT_PROJECTION)
+        results = []
+        for art in articles:
+            snippet, highlights = excerpt(art.get("text"), terms, art.get("summary") or "")
+            # Category names are added per request, so renames show without evicting results
+            results.append((art.get("category_id"), {
+                "article_id": art["article_id"],
+                "title": art["title"],
+                "content_snippet": snippet,
+                "highlights": highlights,
+                "score": art["score"],
+                "status": art.get("status", "draft"),
+                "updated_at": art.get("updated_at")
+            }))
+        cached = (results, facets)
+        search_cache.set(key, cached)
+    
+    results, facets = cached
+    names = await get_category_names()
+    
+    search_latency.record(time.perf_counter() - started)
+    return {
+        "results": [{**result, "category_name": names.get(category_id)} for category_id, result in results],
+        "query": query.query,
+        "mode": mode,
+        "facets": facets_response(facets, names)
+    }
+
+QUICK_SEARCH_MAX_RESULTS = 20
 
 @api_router.get("/search/quick")
 async def quick_search(q: str, limit: int = 5, user: User = Depends(get_current_user)):
@@ -671,34 +1322,154 @@ async def quick_search(q: str, limit: int = 5, user: User = Depends(get_current_
     if not q or len(q) < 2:
         return {"results": []}
     
-    # Simple regex search on title and summary only for speed
-    articles = await db.articles.find(
-        {"$or": [
-            {"title": {"$regex": q, "$options": "i"}},
-            {"summary": {"$regex": q, "$options": "i"}}
-        ]},
-        {"_id": 0, "article_id": 1, "title": 1, "summary": 1, "status": 1, "category_id": 1}
-    ).limit(limit).to_list(limit)
+    # Input is only ever compared for equality with stored prefixes, never used as a pattern
+    terms = prefix_terms(q)
+    if not terms:
+        return {"results": []}
     
+    # Every word typed must start a word of the title; most viewed first
+    projection = {"_id": 0, "article_id": 1, "title": 1, "summary": 1, "status": 1, "category_id": 1}
+    limit = min(limit, QUICK_SEARCH_MAX_RESULTS)
+    if use_article_index():
+        # View counts are the ones of the article's last indexing plus the views counted here
+        ids = article_index.prefix_search(terms, limit, rank_by="view_count")
+        articles = await find_articles_by_id(ids, projection)
+    else:
+        # Index article_autocomplete
+        articles = await db.articles.find(
+            {"title_prefixes": {"$all": terms}}, projection
+        ).sort("view_count", -1).limit(limit).to_list(limit)
+    
+    names = await get_category_names()
     results = []
     for art in articles:
-        # Get category name
-        category_name = None
-        if art.get("category_id"):
-            cat = await db.categories.find_one({"category_id": art["category_id"]}, {"_id": 0, "name": 1})
-            if cat:
-                category_name = cat["name"]
-        
         results.append({
             "article_id": art["article_id"],
             "title": art["title"],
             "summary": (art.get("summary") or "")[:100],
             "status": art.get("status", "draft"),
-            "category_name": category_name
+            "category_name": names.get(art.get("category_id"))
         })
     
     return {"results": results}
 
+# ==================== UPLOAD STORAGE ====================
+
+async def stream_upload_to_disk(file: UploadFile, target_dir: str, max_bytes: int) -> tuple:
+    """Copy an upload to a temporary file in target_dir chunk by chunk, hashing on the way.
+    
+    Returns (temp_path, sha256_hex, size). Aborts with 413 as soon as max_bytes is exceeded.
+    The caller moves the temp file into place (same directory, so the rename is atomic).
+    """
+    await aiofiles.os.makedirs(target_dir, exist_ok=True)
+    temp_path = os.path.join(target_dir, f".upload_{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Datei darf maximal {max_bytes // (1024 * 1024)}MB groß sein"
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        await remove_file_quietly(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+async def remove_file_quietly(path: Optional[str]):
+    if not path:
+        return
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+PDF_BLOB_DIR = f"{PDF_DIR}/blobs"
+
+def pdf_blob_path(sha256: str) -> str:
+    # A blob that was deleted and stored again gets a new file, so a release still
+    # removing the old one can never hit the file of the new blob
+    return f"{PDF_BLOB_DIR}/{sha256[:2]}/{sha256}-{uuid.uuid4().hex[:8]}.pdf"
+
+async def acquire_pdf_blob(temp_path: str, sha256: str, size: int) -> Dict[str, Any]:
+    """Add a reference to the content-addressed blob for sha256, storing temp_path as its file if needed.
+    
+    Identical bytes are stored once no matter how many documents point to them.
+    """
+    blob = await db.document_blobs.find_one_and_update(
+        {"sha256": sha256},
+        {
+            "$inc": {"ref_count": 1},
+            "$setOnInsert": {
+                "file_path": pdf_blob_path(sha256),
+                "size": size,
+                "extraction": None,
+                "created_at": datetime.now(timezone.utc)
+            }
+        },
+        upsert=True,
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if await aiofiles.os.path.exists(blob["file_path"]):
+        await remove_file_quietly(temp_path)
+    else:
+        await aiofiles.os.makedirs(os.path.dirname(blob["file_path"]), exist_ok=True)
+        await aiofiles.os.replace(temp_path, blob["file_path"])
+    return blob
+
+async def release_pdf_blob(sha256: str):
+    """Drop one reference; the blob and its file go away with the last document using them"""
+    blob = await db.document_blobs.find_one_and_update(
+        {"sha256": sha256},
+        {"$inc": {"ref_count": -1}},
+        projection={"_id": 0, "file_path": 1, "ref_count": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not blob or blob["ref_count"] > 0:
+        return
+    # Only delete if nobody re-acquired the blob in the meantime
+    deleted = await db.document_blobs.delete_one(
+        {"sha256": sha256, "file_path": blob["file_path"], "ref_count": {"$lte": 0}}
+    )
+    if deleted.deleted_count:
+        await remove_file_quietly(blob["file_path"])
+
+async def remove_document_file(doc: Dict[str, Any]):
+    if doc.get("sha256") and (doc.get("file_path") or "").startswith(f"{PDF_BLOB_DIR}/"):
+        await release_pdf_blob(doc["sha256"])
+    else:
+        # Documents stored before content addressing own their file
+        await remove_file_quietly(doc.get("file_path") or doc.get("temp_path"))
+
+class UploadSizeLimitMiddleware:
+    """Reject uploads whose declared Content-Length is over the limit before the body is read"""
+    
+    # Allowance for multipart boundaries and form fields around the file
+    MULTIPART_OVERHEAD = 64 * 1024
+    
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in self.limits:
+            max_bytes = self.limits[scope["path"]]
+            content_length = dict(scope["headers"]).get(b"content-length")
+            if content_length and content_length.isdigit() and int(content_length) > max_bytes + self.MULTIPART_OVERHEAD:
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"Datei darf maximal {max_bytes // (1024 * 1024)}MB groß sein"}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
 # ==================== DOCUMENT UPLOAD & PROCESSING ====================
 
 @api_router.post("/documents/upload")
@@ -719,36 +1490,55 @@ async def upload_document(
             detail=f"Eine Datei mit dem Namen '{file.filename}' existiert bereits."
         )
     
-    if existing_doc and force:
-        old_path = existing_doc.get("file_path")
-        if old_path and os.path.exists(old_path):
-            os.remove(old_path)
-        await db.documents.delete_one({"document_id": existing_doc["document_id"]})
-    
-    content = await file.read()
-    doc_id = f"doc_{uuid.uuid4().hex[:12]}"
-    permanent_path = f"/tmp/pdfs/{doc_id}.pdf"
-    
-    os.makedirs("/tmp/pdfs", exist_ok=True)
+    # Store the new file first so a rejected upload never costs the existing document
+    temp_path, sha256, file_size = await stream_upload_to_disk(file, PDF_DIR, MAX_PDF_UPLOAD_BYTES)
+    blob = await acquire_pdf_blob(temp_path, sha256, file_size)
     
-    with open(permanent_path, "wb") as f:
-        f.write(content)
-    
-    doc = Document(
-        document_id=doc_id,
-        filename=file.filename,
-        target_language=target_language,
-        status="pending",
-        uploaded_by=user.user_id
+    try:
+        if existing_doc and force:
+            await job_queue.cancel(existing_doc["document_id"])
+            await db.documents.delete_one({"document_id": existing_doc["document_id"]})
+            await remove_document_file(existing_doc)
+        
+        doc_id = f"doc_{uuid.uuid4().hex[:12]}"
+        doc = Document(
+            document_id=doc_id,
+            filename=file.filename,
+            target_language=target_language,
+            status="pending",
+            uploaded_by=user.user_id
+        )
+        doc_dict = doc.model_dump()
+        doc_dict["file_path"] = blob["file_path"]
+        doc_dict["file_size"] = file_size
+        doc_dict["sha256"] = sha256
+        
+        await db.documents.insert_one(doc_dict)
+    except BaseException:
+        # No document holds the reference taken above
+        await release_pdf_blob(sha256)
+        raise
+    await publish_document_event(
+        "status",
+        {k: v for k, v in doc_dict.items() if DOCUMENT_SUMMARY_PROJECTION.get(k)}
     )
-    doc_dict = doc.model_dump()
-    doc_dict["created_at"] = doc_dict["created_at"].isoformat()
-    doc_dict["file_path"] = permanent_path
-    doc_dict["file_size"] = len(content)
     
-    await db.documents.insert_one(doc_dict)
+    # Same bytes were extracted before: reuse the result instead of running pdfplumber again
+    extraction = blob.get("extraction")
+    if extraction and extraction.get("version") == EXTRACTION_VERSION:
+        await complete_document(doc_id, extraction, reused=True)
+        return {
+            "document_id": doc_id,
+            "filename": doc.filename,
+            "status": "completed",
+            "message": "Dokument bereits verarbeitet"
+        }
     
-    asyncio.create_task(process_document(doc_id, permanent_path, target_language))
+    await job_queue.enqueue(
+        "process_document",
+        {"document_id": doc_id, "file_path": blob["file_path"], "target_language": target_language, "sha256": sha256},
+        key=doc_id
+    )
     
     return {
         "document_id": doc_id,
@@ -757,107 +1547,282 @@ async def upload_document(
         "message": "Dokument wird verarbeitet"
     }
 
-async def process_document(document_id: str, file_path: str, target_language: str):
-    """Process PDF document: extract text and tables"""
+async def publish_document_event(event_type: str, data: Dict[str, Any]):
+    """Push a document event to SSE subscribers; never fails the caller"""
     try:
-        await db.documents.update_one(
-            {"document_id": document_id},
-            {"$set": {"status": "processing"}}
-        )
-        
-        extracted_text = ""
-        html_content = ""
-        page_count = 0
-        extracted_tables = []
-        
-        with pdfplumber.open(file_path) as pdf:
-            page_count = len(pdf.pages)
-            for page_num, page in enumerate(pdf.pages, 1):
-                html_content += f"<div class='pdf-page' data-page='{page_num}'>"
-                
-                text = page.extract_text()
-                if text:
-                    extracted_text += f"--- Seite {page_num} ---\n{text}\n\n"
-                    paragraphs = text.split('\n\n')
-                    for para in paragraphs:
-                        if para.strip():
-                            if len(para.strip()) < 100 and para.strip().isupper():
-                                html_content += f"<h3>{para.strip()}</h3>"
-                            else:
-                                html_content += f"<p>{para.strip()}</p>"
-                
-                tables = page.extract_tables()
-                for table_idx, table in enumerate(tables):
-                    if table and len(table) > 0:
-                        table_html = "<table class='w-full border-collapse my-4 text-sm'>"
-                        for row_idx, row in enumerate(table):
-                            if row:
-                                table_html += "<tr>"
-                                for cell in row:
-                                    cell_content = cell if cell else ""
-                                    if row_idx == 0:
-                                        table_html += f"<th class='border border-slate-400 bg-slate-100 p-2 font-semibold text-left'>{cell_content}</th>"
-                                    else:
-                                        table_html += f"<td class='border border-slate-300 p-2'>{cell_content}</td>"
-                                table_html += "</tr>"
-                        table_html += "</table>"
-                        extracted_tables.append({
-                            "page": page_num,
-                            "index": table_idx,
-                            "html": table_html
-                        })
-                        html_content += table_html
-                
-                html_content += "</div>"
-        
-        if not extracted_text.strip():
-            raise Exception("Kein Text konnte aus dem PDF extrahiert werden")
-        
-        structured_content = {
+        await document_events.publish(event_type, data)
+    except Exception as e:
+        logger.error(f"Could not publish document event: {e}")
+
+async def complete_document(document_id: str, extraction: Dict[str, Any], reused: bool = False):
+    """Store an extraction result on the document and announce it"""
+    processed_at = datetime.now(timezone.utc)
+    await db.documents.update_one(
+        {"document_id": document_id},
+        {"$set": {
+            "status": "completed",
+            "page_count": extraction["page_count"],
+            "extracted_text": extraction["extracted_text"],
+            "structured_content": extraction["structured_content"],
+            "extraction_cpu_seconds": 0.0 if reused else extraction["cpu_seconds"],
+            "extraction_reused": reused,
+            "error_message": None,
+            "processed_at": processed_at
+        }}
+    )
+    await publish_document_event("status", {
+        "document_id": document_id,
+        "status": "completed",
+        "page_count": extraction["page_count"],
+        "error_message": None,
+        "processed_at": processed_at
+    })
+
+async def process_document(document_id: str, file_path: str, target_language: str, sha256: Optional[str] = None):
+    """Process PDF document: extract text and tables"""
+    started = await db.documents.update_one(
+        {"document_id": document_id},
+        {"$set": {"status": "processing"}}
+    )
+    if started.matched_count == 0:
+        logger.info(f"Document {document_id} was deleted before processing")
+        return
+    await publish_document_event("status", {"document_id": document_id, "status": "processing"})
+    
+    if sha256:
+        # An identical upload may have been extracted while this job was waiting
+        blob = await db.document_blobs.find_one({"sha256": sha256}, {"_id": 0, "extraction": 1})
+        extraction = (blob or {}).get("extraction")
+        if extraction and extraction.get("version") == EXTRACTION_VERSION:
+            await complete_document(document_id, extraction, reused=True)
+            logger.info(f"Document {document_id} reused extraction of {sha256[:12]}")
+            return
+    
+    async def report_progress(pages_done: int, page_count: int):
+        await publish_document_event("progress", {
+            "document_id": document_id,
+            "pages_done": pages_done,
+            "page_count": page_count
+        })
+    
+    result = await extraction_engine.extract(file_path, on_progress=report_progress)
+    
+    if not result["extracted_text"].strip():
+        raise PermanentJobError("Kein Text konnte aus dem PDF extrahiert werden")
+    
+    extraction = {
+        "version": EXTRACTION_VERSION,
+        "page_count": result["page_count"],
+        "extracted_text": result["extracted_text"],
+        "structured_content": {
             "headlines": [],
             "bulletpoints": [],
-            "tables": extracted_tables,
+            "tables": result["tables"],
             "images": [],
-            "html_content": html_content
-        }
-        
-        await db.documents.update_one(
-            {"document_id": document_id},
-            {"$set": {
-                "status": "completed",
-                "page_count": page_count,
-                "extracted_text": extracted_text,
-                "structured_content": structured_content,
-                "processed_at": datetime.now(timezone.utc).isoformat()
-            }}
+            "html_content": result["html_content"]
+        },
+        "cpu_seconds": result["cpu_seconds"]
+    }
+    if sha256:
+        await db.document_blobs.update_one(
+            {"sha256": sha256},
+            {"$set": {"extraction": extraction, "extracted_at": datetime.now(timezone.utc)}}
         )
-        
-        logger.info(f"Document {document_id} processed successfully")
-        
-    except Exception as e:
-        logger.error(f"Document processing failed: {e}")
-        await db.documents.update_one(
-            {"document_id": document_id},
-            {"$set": {
-                "status": "failed",
-                "error_message": str(e)
-            }}
+    await complete_document(document_id, extraction)
+    
+    logger.info(f"Document {document_id} processed successfully ({result['page_count']} pages, {result['cpu_seconds']}s CPU, {result['wall_seconds']}s wall)")
+
+async def handle_document_job(job: Dict[str, Any]):
+    payload = job["payload"]
+    if not os.path.exists(payload["file_path"]):
+        raise PermanentJobError("PDF-Datei nicht gefunden")
+    await process_document(
+        payload["document_id"],
+        payload["file_path"],
+        payload["target_language"],
+        payload.get("sha256")
+    )
+
+async def document_job_failed(job: Dict[str, Any], error: Exception, will_retry: bool):
+    """Reflect a failed processing attempt on the document"""
+    update = {
+        "status": "pending" if will_retry else "failed",
+        "error_message": str(error)
+    }
+    await db.documents.update_one(
+        {"document_id": job["payload"]["document_id"]},
+        {"$set": update}
+    )
+    await publish_document_event("status", {"document_id": job["payload"]["document_id"], **update})
+
+job_queue.register("process_document", handle_document_job, on_failure=document_job_failed)
+
+async def recover_document_jobs():
+    """Enqueue documents left pending/processing without a job (e.g. uploaded before the job queue existed)"""
+    stuck = db.documents.find(
+        {"status": {"$in": ["pending", "processing"]}},
+        {"_id": 0, "document_id": 1, "file_path": 1, "target_language": 1, "sha256": 1}
+    )
+    async for doc in stuck:
+        if not doc.get("file_path"):
+            continue
+        await job_queue.enqueue(
+            "process_document",
+            {
+                "document_id": doc["document_id"],
+                "file_path": doc["file_path"],
+                "target_language": doc.get("target_language", "de"),
+                "sha256": doc.get("sha256")
+            },
+            key=doc["document_id"]
         )
 
+# Fields shipped by the document list; text, HTML and tables live behind per-document sub-resources
+DOCUMENT_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "document_id": 1,
+    "filename": 1,
+    "status": 1,
+    "page_count": 1,
+    "file_size": 1,
+    "original_language": 1,
+    "target_language": 1,
+    "summary": 1,
+    "error_message": 1,
+    "uploaded_by": 1,
+    "created_at": 1,
+    "processed_at": 1
+}
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO 8601 string to an aware datetime (naive values are taken as UTC)"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def encode_document_cursor(doc: Dict[str, Any]) -> str:
+    raw = f"{doc['created_at']}|{doc['document_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_document_cursor(cursor: str) -> tuple:
+    try:
+        created_at, document_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return parse_timestamp(created_at), document_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor")
+
 @api_router.get("/documents", response_model=List[Dict])
-async def get_documents(user: User = Depends(get_current_user)):
-    """Get all documents"""
-    docs = await db.documents.find({}, {"_id": 0, "temp_path": 0}).sort("created_at", -1).to_list(100)
+async def get_documents(
+    response: Response,
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    user: User = Depends(get_current_user)
+):
+    """Get documents (summary fields only), newest first.
+    
+    Supports filtering by status and creation time (ISO timestamp). If more documents
+    exist, the cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    limit = max(1, min(limit, 200))
+    query: Dict[str, Any] = {}
+    if status:
+        query["status"] = status
+    if since:
+        try:
+            query["created_at"] = {"$gte": parse_timestamp(since)}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Ungültiger Zeitpunkt für 'since'")
+    if cursor:
+        cursor_created_at, cursor_document_id = decode_document_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": cursor_created_at}},
+            {"created_at": cursor_created_at, "document_id": {"$lt": cursor_document_id}}
+        ]
+    
+    docs = await db.documents.find(query, DOCUMENT_SUMMARY_PROJECTION).sort(
+        [("created_at", -1), ("document_id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_document_cursor(docs[-1])
     return docs
 
+@api_router.get("/documents/events")
+async def stream_document_events(request: Request, user: User = Depends(get_current_user)):
+    """Server-Sent Events: document status transitions and per-page processing progress.
+    
+    Event types: status, progress, deleted, and reset (replay not possible, refetch the list).
+    Reconnecting clients resume via the Last-Event-ID header.
+    """
+    raw_last_event_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id")
+    try:
+        last_event_id = int(raw_last_event_id) if raw_last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    async def stream():
+        async with document_events.subscribe(last_event_id) as queue:
+            if last_event_id is None:
+                # Give a fresh client a position to resume from after a reconnect
+                yield f"retry: 3000\nid: {document_events.last_event_id}\nevent: ready\ndata: {{}}\n\n"
+            else:
+                yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    # Dropped for falling behind; the browser reconnects and replays
+                    break
+                yield event.encode()
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @api_router.get("/documents/{document_id}", response_model=Dict)
 async def get_document(document_id: str, user: User = Depends(get_current_user)):
-    """Get document details"""
+    """Get document details including extracted content"""
     doc = await db.documents.find_one({"document_id": document_id}, {"_id": 0, "temp_path": 0})
     if not doc:
         raise HTTPException(status_code=404, detail="Dokument nicht gefunden")
     return doc
 
+async def get_document_fields(document_id: str, projection: Dict[str, Any]) -> Dict[str, Any]:
+    doc = await db.documents.find_one({"document_id": document_id}, {"_id": 0, "document_id": 1, **projection})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Dokument nicht gefunden")
+    return doc
+
+@api_router.get("/documents/{document_id}/text")
+async def get_document_text(document_id: str, user: User = Depends(get_current_user)):
+    """Get the extracted plain text of a document"""
+    doc = await get_document_fields(document_id, {"extracted_text": 1})
+    return {"document_id": document_id, "extracted_text": doc.get("extracted_text")}
+
+@api_router.get("/documents/{document_id}/html")
+async def get_document_html(document_id: str, user: User = Depends(get_current_user)):
+    """Get the extracted HTML of a document"""
+    doc = await get_document_fields(document_id, {"structured_content.html_content": 1})
+    html_content = (doc.get("structured_content") or {}).get("html_content")
+    return {"document_id": document_id, "html_content": html_content}
+
+@api_router.get("/documents/{document_id}/tables")
+async def get_document_tables(document_id: str, user: User = Depends(get_current_user)):
+    """Get the tables extracted from a document"""
+    doc = await get_document_fields(document_id, {"structured_content.tables": 1})
+    tables = (doc.get("structured_content") or {}).get("tables") or []
+    return {"document_id": document_id, "tables": tables}
+
 @api_router.delete("/documents/{document_id}")
 async def delete_document(document_id: str, user: User = Depends(get_current_user)):
     """Delete a document (admin only)"""
@@ -868,35 +1833,37 @@ async def delete_document(document_id: str, user: User = Depends(get_current_use
     if not doc:
         raise HTTPException(status_code=404, detail="Dokument nicht gefunden")
     
-    file_path = doc.get("file_path") or doc.get("temp_path")
-    if file_path and os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-        except Exception:
-            pass
-    
+    await job_queue.cancel(document_id)
     await db.documents.delete_one({"document_id": document_id})
+    await remove_document_file(doc)
+    await publish_document_event("deleted", {"document_id": document_id})
     return {"message": "Dokument gelöscht"}
 
 @api_router.get("/documents/{document_id}/pdf-embed")
-async def get_document_pdf_embed(document_id: str, token: str = None):
-    """Get PDF file for iframe embedding"""
-    from fastapi.responses import Response
-    
-    doc = await db.documents.find_one({"document_id": document_id})
+async def get_document_pdf_embed(document_id: str, request: Request, token: str = None):
+    """Get PDF file for iframe embedding (supports Range requests and conditional GET)"""
+    doc = await db.documents.find_one(
+        {"document_id": document_id},
+        {"_id": 0, "file_path": 1, "sha256": 1}
+    )
     if not doc:
         raise HTTPException(status_code=404, detail="Dokument nicht gefunden")
     
     file_path = doc.get("file_path")
-    if not file_path or not os.path.exists(file_path):
+    try:
+        stat_result = await aiofiles.os.stat(file_path) if file_path else None
+    except FileNotFoundError:
+        stat_result = None
+    if not stat_result:
         raise HTTPException(status_code=404, detail="PDF-Datei nicht gefunden")
     
-    with open(file_path, "rb") as f:
-        content = f.read()
-    
-    return Response(
-        content=content,
+    return serve_file(
+        request,
+        file_path,
         media_type="application/pdf",
+        # Content hash is a strong validator; older documents fall back to Starlette's stat-based ETag
+        etag=f'"{doc["sha256"]}"' if doc.get("sha256") else None,
+        stat_result=stat_result,
         headers={
             "Content-Disposition": "inline",
             "Cache-Control": "public, max-age=3600",
@@ -913,61 +1880,157 @@ async def upload_image(file: UploadFile = File(...), user: User = Depends(get_cu
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="Nur Bilder sind erlaubt (JPEG, PNG, GIF, WebP)")
     
-    content = await file.read()
-    if len(content) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Bild darf maximal 10MB groß sein")
-    
-    images_dir = "/tmp/images"
-    os.makedirs(images_dir, exist_ok=True)
-    
     ext = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
     image_id = f"img_{uuid.uuid4().hex[:12]}"
     filename = f"{image_id}.{ext}"
-    file_path = f"{images_dir}/{filename}"
+    file_path = f"{IMAGE_DIR}/{filename}"
     
-    with open(file_path, "wb") as f:
-        f.write(content)
+    temp_path, sha256, size = await stream_upload_to_disk(file, IMAGE_DIR, MAX_IMAGE_UPLOAD_BYTES)
+    try:
+        width, height = await asyncio.to_thread(probe_image, temp_path)
+    except Exception:
+        await remove_file_quietly(temp_path)
+        raise HTTPException(status_code=400, detail="Ungültige Bilddatei")
+    await aiofiles.os.replace(temp_path, file_path)
     
     image_doc = {
         "image_id": image_id,
         "filename": filename,
         "original_filename": file.filename,
         "content_type": file.content_type,
-        "size": len(content),
+        "size": size,
+        "width": width,
+        "height": height,
+        "sha256": sha256,
         "file_path": file_path,
         "uploaded_by": user.user_id,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     await db.images.insert_one(image_doc)
     
+    # Pre-render the common variants so the first article view doesn't wait for them
+    fmt = variant_format(file.content_type)
+    if fmt:
+        widths = [w for w in VARIANT_WIDTHS if w < width]
+        run_in_background(ensure_image_variants(image_id, file_path, widths, [fmt]))
+        if fmt != "webp":
+            run_in_background(ensure_image_variants(image_id, file_path, widths + [None], ["webp"]))
+    
+    url = f"/api/images/{image_id}"
     return {
         "image_id": image_id,
-        "url": f"/api/images/{image_id}",
-        "filename": file.filename
+        "url": url,
+        "filename": file.filename,
+        "width": width,
+        "height": height,
+        "srcset": image_srcset(url, width, fmt),
+        "srcset_webp": image_srcset(url, width, "webp") if fmt else None
     }
 
-@api_router.get("/images/{image_id}")
-async def get_image(image_id: str):
-    """Serve an uploaded image"""
-    from fastapi.responses import Response
+def image_srcset(url: str, width: int, fmt: Optional[str]) -> str:
+    """srcset attribute value listing the offered widths up to the original width"""
+    suffix = "&format=webp" if fmt == "webp" else ""
+    entries = [f"{url}?w={w}{suffix} {w}w" for w in VARIANT_WIDTHS if fmt and w < width]
+    entries.append(f"{url}?format=webp {width}w" if suffix else f"{url} {width}w")
+    return ", ".join(entries)
+
+def run_in_background(coro):
+    """Fire and forget, keeping a reference so the task isn't garbage collected"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+def image_variant_dir(image_id: str) -> str:
+    return f"{IMAGE_DIR}/variants/{image_id}"
+
+async def ensure_image_variants(image_id: str, source_path: str, widths: list, formats: list):
+    """Render missing variants in the image pool; concurrent calls for the same variants share one job"""
+    key = f"{image_id}:{widths}:{formats}"
+    task = image_variant_tasks.get(key)
+    if task is None:
+        task = asyncio.ensure_future(image_engine.run(render_variants, source_path, image_variant_dir(image_id), widths, formats))
+        image_variant_tasks[key] = task
+        task.add_done_callback(lambda _: image_variant_tasks.pop(key, None))
+    try:
+        await asyncio.shield(task)
+    except Exception as e:
+        logger.error(f"Rendering variants of image {image_id} failed: {e}")
+        raise
+
+async def get_image_meta(image_id: str) -> Optional[Dict[str, Any]]:
+    """Path, content type and ETag of an image, from the LRU cache or the database"""
+    meta = image_meta_cache.get(image_id)
+    if meta is not None:
+        return meta
+    
+    image_doc = await db.images.find_one(
+        {"image_id": image_id},
+        {"_id": 0, "file_path": 1, "content_type": 1, "original_filename": 1, "sha256": 1, "width": 1}
+    )
+    if not image_doc or not image_doc.get("file_path"):
+        return None
     
-    image_doc = await db.images.find_one({"image_id": image_id})
-    if not image_doc:
+    meta = {
+        "file_path": image_doc["file_path"],
+        "content_type": image_doc.get("content_type", "image/jpeg"),
+        "original_filename": image_doc.get("original_filename", "image"),
+        "width": image_doc.get("width"),
+        "sha256": image_doc.get("sha256"),
+        # Images uploaded before content hashing get Starlette's stat-based ETag
+        "etag": f'"{image_doc["sha256"]}"' if image_doc.get("sha256") else None
+    }
+    image_meta_cache.set(image_id, meta)
+    return meta
+
+@api_router.get("/images/{image_id}")
+async def get_image(image_id: str, request: Request, w: Optional[int] = None, format: Optional[str] = None):
+    """Serve an uploaded image, optionally resized (?w=) and/or as WebP (?format=webp)"""
+    if format is not None and format != "webp":
+        raise HTTPException(status_code=400, detail="Ungültiges Bildformat")
+    if w is not None and w <= 0:
+        raise HTTPException(status_code=400, detail="Ungültige Bildbreite")
+    
+    meta = await get_image_meta(image_id)
+    if not meta:
         raise HTTPException(status_code=404, detail="Bild nicht gefunden")
     
-    file_path = image_doc.get("file_path")
-    if not file_path or not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Bilddatei nicht gefunden")
+    file_path = meta["file_path"]
+    media_type = meta["content_type"]
+    etag = meta["etag"]
+    original_fmt = variant_format(media_type)
+    
+    # GIFs (possibly animated) are always served as uploaded
+    if original_fmt and (w or format):
+        fmt = format or original_fmt
+        width = snap_width(w, meta["width"]) if w else None
+        if width or fmt != original_fmt:
+            file_path = variant_path(image_variant_dir(image_id), width, fmt)
+            media_type = IMAGE_FORMATS[fmt][1]
+            etag = f'"{meta["sha256"]}-{os.path.basename(file_path)}"' if meta["sha256"] else None
+            if not await aiofiles.os.path.exists(file_path):
+                if not await aiofiles.os.path.exists(meta["file_path"]):
+                    image_meta_cache.pop(image_id)
+                    raise HTTPException(status_code=404, detail="Bilddatei nicht gefunden")
+                try:
+                    await ensure_image_variants(image_id, meta["file_path"], [width], [fmt])
+                except Exception:
+                    raise HTTPException(status_code=500, detail="Bild konnte nicht umgewandelt werden")
     
-    with open(file_path, "rb") as f:
-        content = f.read()
+    try:
+        stat_result = await aiofiles.os.stat(file_path)
+    except FileNotFoundError:
+        image_meta_cache.pop(image_id)
+        raise HTTPException(status_code=404, detail="Bilddatei nicht gefunden")
     
-    return Response(
-        content=content,
-        media_type=image_doc.get("content_type", "image/jpeg"),
+    return serve_file(
+        request,
+        file_path,
+        media_type=media_type,
+        etag=etag,
+        stat_result=stat_result,
         headers={
-            "Cache-Control": "public, max-age=31536000",
-            "Content-Disposition": f"inline; filename=\"{image_doc.get('original_filename', 'image')}\""
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "Content-Disposition": f"inline; filename=\"{meta['original_filename']}\""
         }
     )
 
@@ -984,12 +2047,12 @@ async def get_stats(user: User = Depends(get_current_user)):
     total_documents = await db.documents.count_documents({})
     pending_documents = await db.documents.count_documents({"status": "pending"})
     
-    recent_articles = await db.articles.find({}, {"_id": 0}).sort("updated_at", -1).limit(5).to_list(5)
-    top_articles = await db.articles.find({}, {"_id": 0}).sort("view_count", -1).limit(5).to_list(5)
+    recent_articles = await db.articles.find({}, ARTICLE_PROJECTION).sort("updated_at", -1).limit(5).to_list(5)
+    top_articles = await db.articles.find({}, ARTICLE_PROJECTION).sort("view_count", -1).limit(5).to_list(5)
     
     favorite_articles = await db.articles.find(
         {"favorited_by": user.user_id},
-        {"_id": 0}
+        ARTICLE_PROJECTION
     ).sort("updated_at", -1).limit(5).to_list(5)
     
     user_data = await db.users.find_one({"user_id": user.user_id}, {"_id": 0, "recently_viewed": 1})
@@ -997,10 +2060,12 @@ async def get_stats(user: User = Depends(get_current_user)):
     recently_viewed = []
     if recently_viewed_ids:
         for article_id in recently_viewed_ids:
-            article = await db.articles.find_one({"article_id": article_id}, {"_id": 0})
+            article = await db.articles.find_one({"article_id": article_id}, ARTICLE_PROJECTION)
             if article:
                 recently_viewed.append(article)
     
+    await add_category_names(recent_articles + top_articles + favorite_articles + recently_viewed)
+    
     user_articles_count = await db.articles.count_documents({"created_by": user.user_id})
     user_documents_count = await db.documents.count_documents({"uploaded_by": user.user_id})
     
@@ -1051,9 +2116,9 @@ async def get_favorites(user: User = Depends(get_current_user)):
     """Get all favorite articles for current user"""
     articles = await db.articles.find(
         {"favorited_by": user.user_id},
-        {"_id": 0}
+        ARTICLE_PROJECTION
     ).sort("updated_at", -1).to_list(100)
-    return articles
+    return await add_category_names(articles)
 
 # ==================== RECENTLY VIEWED ====================
 
@@ -1072,6 +2137,11 @@ async def mark_as_viewed(article_id: str, user: User = Depends(get_current_user)
         {"article_id": article_id},
         {"$inc": {"view_count": 1}}
     )
+    if SEARCH_ENGINE == "index":
+        # Autocomplete ranks by it; not worth an event to every worker
+        meta = article_index.meta(article_id)
+        if meta is not None:
+            meta["view_count"] = meta.get("view_count", 0) + 1
     return {"message": "Als angesehen markiert"}
 
 # ==================== PRESENCE / ACTIVE EDITORS ====================
@@ -1114,16 +2184,24 @@ async def remove_presence(article_id: str, user: User = Depends(get_current_user
 @api_router.get("/widget/search")
 async def widget_search(q: str, limit: int = 3):
     """Public widget search endpoint"""
-    articles = await db.articles.find(
-        {
-            "status": "published",
-            "$or": [
-                {"title": {"$regex": q, "$options": "i"}},
-                {"content": {"$regex": q, "$options": "i"}}
-            ]
-        },
-        {"_id": 0, "article_id": 1, "title": 1, "summary": 1}
-    ).limit(limit).to_list(limit)
+    terms = analyze(q)
+    if not terms:
+        return {"results": [], "query": q}
+    
+    # Published articles only, so cached apart from the internal search
+    key = ("published", article_corpus_version, use_article_index(), tuple(tokenize(q)), limit)
+    articles = search_cache.get(key)
+    if articles is None:
+        projection = {"_id": 0, "article_id": 1, "title": 1, "summary": 1}
+        if use_article_index():
+            articles = await search_article_index(
+                correct_typos(terms), limit, projection, where=lambda meta: meta["status"] == "published"
+            )
+        else:
+            articles = await search_articles_mongo(terms, limit, {"status": "published"}, projection)
+        for art in articles:
+            del art["score"]
+        search_cache.set(key, articles)
     
     return {"results": articles, "query": q}
 
@@ -1138,34 +2216,86 @@ async def widget_get_article(article_id: str):
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
     return article
 
-# ==================== ROOT ====================
-
-@api_router.get("/")
-async def root():
-    return {"message": "CANUSA Knowledge Hub API", "version": "2.0.0"}
-
-# Include the router in the main app
-app.include_router(api_router)
+# ==================== METRICS ====================
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@api_router.get("/metrics")
+async def get_metrics(user: User = Depends(get_current_user)):
+    """Runtime metrics of the worker serving this request (admin only)"""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Nur Administratoren können Metriken abrufen")
+    
+    return {
+        "extraction": extraction_engine.stats(),
+        "jobs": {**job_queue.stats(), "by_status": await job_queue.counts()},
+        "document_events": document_events.stats(),
+        "migrations": await migration_runner.status(),
+        "login_latency": login_latency.stats(),
+        "password_hashing": password_hasher.stats(),
+        "session_cache": session_cache.stats(),
+        "category_cache": {"categories": len(category_names) if category_names is not None else None, "loads": category_names_loads},
+        "session_tokens": {"signed": session_signer is not None, **session_revocations.stats()},
+        "cache_invalidations": cache_events.stats(),
+        "search": {
+            "engine": SEARCH_ENGINE,
+            "latency": search_latency.stats(),
+            "typo_corrections": search_typo_corrections,
+            "cache": {**search_cache.stats(), "corpus_version": article_corpus_version},
+            "index": {
+                "ready": article_index_ready,
+                **article_index.stats(),
+                "vectors": article_vectors.stats()
+            } if SEARCH_ENGINE == "index" else None
+        },
+        "image_cache": image_meta_cache.stats(),
+        "image_variants": {**image_engine.stats(), "rendering": len(image_variant_tasks)},
+        "text_analysis": text_engine.stats()
+    }
 
-@app.on_event("startup")
-async def startup():
-    """Initialize database and create default admin"""
-    # Create indexes
+# ==================== DATA MIGRATIONS ====================
+# Each migration runs once per database (recorded in db.migrations). Never change an
+# applied migration; add a new version instead.
+
+async def create_required_schema():
+    """Collections and unique indexes that must exist before the first write; idempotent.
+    
+    Awaited on every startup before anything can publish, enqueue or accept a request,
+    so it doesn't wait for the migrations running in the background.
+    """
+    # Publishing before the event collections exist would create them uncapped, for good
+    for name, size, max_docs in [
+        ("document_events", 16 * 1024 * 1024, 20000),
+        ("cache_invalidations", 1024 * 1024, 5000)
+    ]:
+        try:
+            await db.create_collection(name, capped=True, size=size, max=max_docs)
+        except CollectionInvalid:
+            pass
+        await db[name].create_index("seq")
+    
+    await db.users.create_index("email", unique=True)
+    await db.users.create_index("user_id", unique=True)
+    await db.documents.create_index("document_id", unique=True)
+    await db.document_blobs.create_index("sha256", unique=True)
+    await db.images.create_index("image_id", unique=True)
+    await job_queue.create_indexes()
+
+@migration_runner.register(1, "indexes and event collections")
+async def migration_initial_indexes():
+    await create_required_schema()
     await db.articles.create_index([("title", "text"), ("content", "text")])
     await db.articles.create_index("status")
     await db.articles.create_index("category_id")
-    await db.users.create_index("email", unique=True)
+    await db.session_revocations.create_index("expires_at", expireAfterSeconds=0)
+    await db.session_revocations.create_index("user_id")
     await db.user_sessions.create_index("session_token")
-    
-    # Check for existing admin user
+    # Let MongoDB delete sessions once they expired (only works on BSON dates)
+    await db.user_sessions.create_index("expires_at", expireAfterSeconds=0)
+    await db.documents.create_index([("created_at", -1), ("document_id", -1)])
+    await db.documents.create_index([("status", 1), ("created_at", -1)])
+    await db.documents.create_index("sha256")
+
+@migration_runner.register(2, "default admin user")
+async def migration_default_admin():
     admin_exists = await db.users.find_one({"email": DEFAULT_ADMIN_EMAIL})
     
     if admin_exists:
@@ -1175,7 +2305,7 @@ async def startup():
             await db.users.update_one(
                 {"email": DEFAULT_ADMIN_EMAIL},
                 {"$set": {
-                    "password_hash": get_password_hash(DEFAULT_ADMIN_PASSWORD),
+                    "password_hash": await get_password_hash(DEFAULT_ADMIN_PASSWORD),
                     "role": "admin",
                     "is_blocked": False
                 }}
@@ -1187,15 +2317,196 @@ async def startup():
             "user_id": f"user_{uuid.uuid4().hex[:12]}",
             "email": DEFAULT_ADMIN_EMAIL,
             "name": DEFAULT_ADMIN_NAME,
-            "password_hash": get_password_hash(DEFAULT_ADMIN_PASSWORD),
+            "password_hash": await get_password_hash(DEFAULT_ADMIN_PASSWORD),
             "role": "admin",
             "is_blocked": False,
             "recently_viewed": [],
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc)
         }
         await db.users.insert_one(admin_user)
         logger.info(f"Default admin user created: {DEFAULT_ADMIN_EMAIL}")
 
+# Fields that used to be written as ISO strings and are BSON dates now
+TIMESTAMP_FIELDS = {
+    "users": ["created_at", "updated_at"],
+    "user_sessions": ["expires_at", "created_at"],
+    "categories": ["created_at", "updated_at"],
+    "articles": ["created_at", "updated_at", "review_date"],
+    "documents": ["created_at", "processed_at"],
+    "document_blobs": ["created_at", "extracted_at"],
+    "images": ["created_at"]
+}
+
+def timestamp_update(field: str):
+    def build(row: Dict[str, Any]) -> UpdateOne:
+        try:
+            update = {"$set": {field: parse_timestamp(row[field])}}
+        except ValueError:
+            # Keep unparseable values aside instead of selecting them again forever
+            update = {"$set": {field: None, f"{field}_unparsed": row[field]}}
+        return UpdateOne({"_id": row["_id"], field: row[field]}, update)
+    return build
+
+@migration_runner.register(3, "timestamps as BSON dates")
+async def migration_string_timestamps():
+    for collection_name, fields in TIMESTAMP_FIELDS.items():
+        for field in fields:
+            await bulk_update(
+                db[collection_name],
+                {field: {"$type": "string"}},
+                {"_id": 1, field: 1},
+                timestamp_update(field),
+                label=f"{collection_name}.{field}"
+            )
+
+@migration_runner.register(4, "weighted German text index on articles")
+async def migration_article_text_index():
+    # A collection can only have one text index, so the unweighted title/content one goes first
+    for name, info in (await db.articles.index_information()).items():
+        if any(kind == "text" for _, kind in info["key"]):
+            await db.articles.drop_index(name)
+    await db.articles.create_index(
+        [(field, "text") for field in ARTICLE_TEXT_WEIGHTS],
+        weights=ARTICLE_TEXT_WEIGHTS,
+        default_language=ARTICLE_TEXT_LANGUAGE,
+        # Articles have no per-document language; don't let a "language" field switch analyzers
+        language_override="text_language",
+        name="article_text"
+    )
+
+@migration_runner.register(5, "title prefixes for autocomplete")
+async def migration_title_prefixes():
+    await bulk_update(
+        db.articles,
+        {"title_prefixes": {"$exists": False}},
+        {"_id": 1, "title": 1},
+        lambda article: UpdateOne(
+            {"_id": article["_id"]},
+            {"$set": {"title_prefixes": edge_ngrams(article.get("title") or "")}}
+        ),
+        label="title_prefixes"
+    )
+    await db.articles.create_index([("title_prefixes", 1), ("view_count", -1)], name="article_autocomplete")
+
+@migration_runner.register(6, "German analyzer: stored search terms")
+async def migration_search_terms():
+    async def with_search_terms(rows):
+        # Analyzing long articles is CPU work; keep it off the event loop
+        terms = await extraction_engine.run(analyze_articles, rows)
+        return [{**row, "search": search} for row, search in zip(rows, terms)]
+    
+    await bulk_update(
+        db.articles,
+        {"search.version": {"$ne": ANALYZER_VERSION}},
+        {"_id": 1, "title": 1, "summary": 1, "tags": 1, "content": 1},
+        lambda article: UpdateOne(
+            {"_id": article["_id"]},
+            {"$set": {"search": article["search"], "title_prefixes": edge_ngrams(article.get("title") or "")}}
+        ),
+        batch_size=200,
+        label="search",
+        prepare=with_search_terms
+    )
+    # Only one text index per collection: article_text (raw fields, German stemming) goes
+    for name, info in (await db.articles.index_information()).items():
+        if any(kind == "text" for _, kind in info["key"]):
+            await db.articles.drop_index(name)
+    await db.articles.create_index(
+        [(f"search.{field}", "text") for field in ARTICLE_TEXT_WEIGHTS],
+        weights={f"search.{field}": weight for field, weight in ARTICLE_TEXT_WEIGHTS.items()},
+        default_language="none",
+        language_override="text_language",
+        name="article_search"
+    )
+
+@migration_runner.register(7, "plain text and sentences for search excerpts")
+async def migration_article_text():
+    async def with_text(rows):
+        features = await extraction_engine.run(article_text_features, [row.get("content") or "" for row in rows])
+        return [{**row, **row_features} for row, row_features in zip(rows, features)]
+    
+    await bulk_update(
+        db.articles,
+        {"text.version": {"$ne": TEXT_VERSION}},
+        {"_id": 1, "content": 1},
+        # An article saved meanwhile already has its current text
+        lambda article: UpdateOne(
+            {"_id": article["_id"], "text.version": {"$ne": TEXT_VERSION}},
+            {"$set": {"text": article["text"], "word_count": article["word_count"]}}
+        ),
+        batch_size=200,
+        label="text",
+        prepare=with_text
+    )
+
+async def run_migrations():
+    """Apply pending migrations; if another worker is migrating, take over should it die"""
+    while True:
+        try:
+            await migration_runner.run_pending()
+            if not await migration_runner.pending():
+                return
+        except Exception as e:
+            logger.error(f"Migration failed: {e}")
+        await asyncio.sleep(migration_runner.lease_seconds)
+
+# ==================== ROOT ====================
+
+@api_router.get("/")
+async def root():
+    return {"message": "CANUSA Knowledge Hub API", "version": "2.0.0"}
+
+# Include the router in the main app
+app.include_router(api_router)
+
+app.add_middleware(UploadSizeLimitMiddleware, limits={
+    "/api/documents/upload": MAX_PDF_UPLOAD_BYTES,
+    "/api/images/upload": MAX_IMAGE_UPLOAD_BYTES
+})
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_credentials=True,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.on_event("startup")
+async def startup():
+    """Start background services; all other schema setup runs as migrations in the background"""
+    await create_required_schema()
+    run_in_background(run_migrations())
+    
+    global cache_listener_task
+    await cache_events.start()
+    # Replay from here so nothing published while loading the persisted revocations is missed
+    cache_listener_task = asyncio.create_task(listen_for_cache_invalidations(cache_events.last_event_id))
+    await load_session_revocations()
+    
+    # Start document processing workers; orphaned jobs from a crash are requeued
+    await document_events.start()
+    await job_queue.start()
+    await recover_document_jobs()
+    
+    if SEARCH_ENGINE == "index":
+        run_in_background(load_article_index())
+        run_in_background(snapshot_article_index_periodically())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if article_index_ready and article_index_dirty:
+        try:
+            await save_article_index()
+        except Exception as e:
+            logger.error(f"Writing the search index snapshot failed: {e}")
+    await job_queue.stop()
+    await document_events.stop()
+    if cache_listener_task:
+        cache_listener_task.cancel()
+    await cache_events.stop()
+    extraction_engine.shutdown()
+    image_engine.shutdown()
+    text_engine.shutdown()
+    password_hasher.shutdown()
     client.close()
@@ -0,0 +1,101 @@
+"""Signed, self-contained session tokens.
+
+With SESSION_SIGNING_KEY set, the session cookie carries the user's id, role,
+name, e-mail and expiry plus an HMAC-SHA256 signature, so an authenticated
+request is validated with CPU only. The session is still stored in
+user_sessions (the token is its session_token) which keeps the database path
+as a fallback and makes switching modes transparent for logged-in users.
+
+Revocation is kept in memory by RevocationList:
+- a logged-out session id is rejected until its token would have expired,
+- a change to a user (role, password, block, delete) marks all of that user's
+  tokens issued before the change as stale; stale tokens are re-checked against
+  the database instead of being trusted.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, Iterable, Optional
+
+TOKEN_PREFIX = "v1."
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class SessionTokenSigner:
+    def __init__(self, key: str):
+        self._key = hashlib.sha256(key.encode("utf-8")).digest()
+
+    def _sign(self, body: str) -> str:
+        return _b64encode(hmac.new(self._key, body.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, user: Dict[str, Any], session_id: str, expires_at: float) -> str:
+        payload = {
+            "uid": user["user_id"],
+            "sid": session_id,
+            "role": user["role"],
+            "email": user["email"],
+            "name": user["name"],
+            "created": user.get("created_at"),
+            "iat": time.time(),
+            "exp": int(expires_at)
+        }
+        body = _b64encode(json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8"))
+        return f"{TOKEN_PREFIX}{body}.{self._sign(body)}"
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Payload of a correctly signed, unexpired token, otherwise None"""
+        if not token.startswith(TOKEN_PREFIX):
+            return None
+        body, _, signature = token[len(TOKEN_PREFIX):].partition(".")
+        if not signature or not hmac.compare_digest(signature, self._sign(body)):
+            return None
+        try:
+            payload = json.loads(_b64decode(body))
+        except ValueError:
+            return None
+        if payload.get("exp", 0) <= time.time():
+            return None
+        return payload
+
+
+class RevocationList:
+    def __init__(self):
+        self._sessions: Dict[str, float] = {}
+        self._users: Dict[str, float] = {}
+
+    def revoke_session(self, session_id: str, expires_at: float):
+        self._sessions[session_id] = expires_at
+
+    def revoke_user(self, user_id: str, not_before: float):
+        self._users[user_id] = max(not_before, self._users.get(user_id, 0.0))
+
+    def load(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            if row.get("session_id"):
+                self.revoke_session(row["session_id"], row["expires_at"].timestamp())
+            if row.get("user_id"):
+                self.revoke_user(row["user_id"], row["not_before"])
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        return payload["sid"] in self._sessions
+
+    def is_stale(self, payload: Dict[str, Any]) -> bool:
+        return payload["iat"] <= self._users.get(payload["uid"], 0.0)
+
+    def prune(self, max_token_age: float):
+        """Forget entries that no token still in circulation can be affected by"""
+        now = time.time()
+        self._sessions = {sid: exp for sid, exp in self._sessions.items() if exp > now}
+        self._users = {uid: ts for uid, ts in self._users.items() if ts > now - max_token_age}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"revoked_sessions": len(self._sessions), "stale_users": len(self._users)}
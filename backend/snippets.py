@@ -0,0 +1,120 @@
+"""Search result excerpts from text precomputed when an article is saved.
+
+text_features() derives everything an excerpt needs from the article HTML:
+the sanitized plain text, its word count, the offsets at which sentences start
+and, for every search term, the first sentences it occurs in. excerpt() looks
+the query terms up in that map, takes the sentence covering the most of them
+and analyzes only the words of the excerpt to highlight the matches, so its
+cost depends on the matches and the excerpt length, not on the article length.
+"""
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from text_analysis import ANALYZER_VERSION, analyze, html_paragraphs
+
+# The term map holds analyzed terms; both change when the analyzer does. Stored text of
+# another version is ignored by excerpt(), so a bump needs a new migration recomputing it.
+TEXT_VERSION = f"1/{ANALYZER_VERSION}"
+EXCERPT_LENGTH = 300
+# Sentences remembered per term; the excerpt only ever shows one
+MAX_SENTENCES_PER_TERM = 3
+# Longer sentences are split, so a match is never further than this from an excerpt's start
+MAX_SENTENCE_LENGTH = EXCERPT_LENGTH // 2
+
+_WORD_RE = re.compile(r"\w+")
+# A sentence ends at . ! ? followed by a capitalised word or a digit ("ca. 5" stays one sentence)
+_SENTENCE_END_RE = re.compile(r"[.!?…]+[\"'“”»)]*\s+(?=[A-ZÄÖÜ0-9\"'„«(])")
+
+
+def _sentence_starts(paragraph: str) -> List[int]:
+    ends = [match.end() for match in _SENTENCE_END_RE.finditer(paragraph)]
+    starts = []
+    for start, end in zip([0] + ends, ends + [len(paragraph)]):
+        while end - start > MAX_SENTENCE_LENGTH:
+            starts.append(start)
+            space = paragraph.rfind(" ", start + 1, start + MAX_SENTENCE_LENGTH)
+            start = space + 1 if space > 0 else start + MAX_SENTENCE_LENGTH
+        starts.append(start)
+    return starts
+
+
+def text_features(content: str) -> Dict[str, Any]:
+    """Plain text, word count and excerpt data of article HTML, stored as article.text and word_count"""
+    paragraphs = html_paragraphs(content)
+    plain = " ".join(paragraphs)
+    # Headings and list items end a sentence even without punctuation
+    sentences = []
+    offset = 0
+    for paragraph in paragraphs:
+        sentences.extend(offset + start for start in _sentence_starts(paragraph))
+        offset += len(paragraph) + 1
+    terms: Dict[str, List[int]] = {}
+    for number, start in enumerate(sentences):
+        end = sentences[number + 1] if number + 1 < len(sentences) else len(plain)
+        for term in set(analyze(plain[start:end])):
+            found = terms.setdefault(term, [])
+            if len(found) < MAX_SENTENCES_PER_TERM:
+                found.append(number)
+    return {
+        "word_count": len(_WORD_RE.findall(plain)),
+        "text": {"version": TEXT_VERSION, "plain": plain, "sentences": sentences, "terms": terms}
+    }
+
+
+def article_text_features(contents: List[str]) -> List[Dict[str, Any]]:
+    """text_features for a batch; picklable, for running in a process pool"""
+    return [text_features(content) for content in contents]
+
+
+def highlights(text: str, terms: Set[str]) -> List[List[int]]:
+    """[start, end) offsets of the words in text that analyze to one of terms"""
+    return [
+        [match.start(), match.end()]
+        for match in _WORD_RE.finditer(text)
+        if not terms.isdisjoint(analyze(match.group()))
+    ]
+
+
+def _cut(plain: str, start: int, length: int) -> str:
+    """length characters of plain from start, shortened to a word boundary, with ellipses where cut"""
+    end = start + length
+    if end >= len(plain):
+        excerpt = plain[start:]
+    else:
+        excerpt = plain[start:end]
+        space = excerpt.rfind(" ")
+        excerpt = (excerpt[:space] if space > length // 2 else excerpt).rstrip(" ,;:-") + "..."
+    return "..." + excerpt if start > 0 else excerpt
+
+
+def excerpt(
+    text: Optional[Dict[str, Any]],
+    terms: List[str],
+    summary: str = "",
+    length: int = EXCERPT_LENGTH
+) -> Tuple[str, List[List[int]]]:
+    """Excerpt for a search result and the offsets of the query terms in it.
+
+    text is article.text, terms the analyzed query. The sentence containing the
+    most distinct terms is shown (the earliest one on a tie); without matches
+    in the text the summary, failing that the beginning of the text. Text of
+    another TEXT_VERSION is treated as missing: its term map would not match
+    the query terms.
+    """
+    if text and text.get("version") != TEXT_VERSION:
+        text = None
+    wanted = set(terms)
+    plain = text["plain"] if text else ""
+    matches: Dict[int, int] = {}
+    if text:
+        for term in wanted:
+            for number in text["terms"].get(term, ()):
+                matches[number] = matches.get(number, 0) + 1
+    if matches:
+        best = min(matches, key=lambda number: (-matches[number], number))
+        snippet = _cut(plain, text["sentences"][best], length)
+    elif summary:
+        snippet = summary if len(summary) <= length else _cut(summary, 0, length)
+    else:
+        snippet = _cut(plain, 0, length)
+    return snippet, highlights(snippet, wanted)
@@ -0,0 +1,359 @@
+"""
+Iteration 10: Document pipeline performance
+1. GET /api/documents - Summary projection, status/since filters, cursor pagination
+2. GET /api/documents/{id}/text|html|tables - Heavy content as sub-resources
+3. GET /api/documents/events - Server-Sent Events for processing status
+4. GET /api/documents/{id}/pdf-embed - Range requests, ETag and 304
+5. GET /api/images/{id} - Streaming with ETag and 304, resized/WebP variants
+6. POST /api/documents/upload - Size limit (413) before and while streaming the upload
+7. Content-addressed PDF storage - identical uploads share one file and its extraction
+"""
+import http.client
+import io
+import pytest
+import requests
+import os
+import time
+import uuid
+from urllib.parse import urlsplit
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+ADMIN_EMAIL = "marc.hansen@canusa.de"
+ADMIN_PASSWORD = "CanusaNexus2024!"
+
+HEAVY_FIELDS = ["extracted_text", "structured_content", "file_path"]
+MAX_PDF_UPLOAD_BYTES = int(os.environ.get("MAX_PDF_UPLOAD_MB", "100")) * 1024 * 1024
+
+
+def pdf_bytes(text):
+    """Minimal one-page PDF showing text"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Login as admin and return auth headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD, "stay_logged_in": False}
+    )
+    assert response.status_code == 200, f"Admin login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.cookies.get('session_token')}"}
+
+
+class TestDocumentList:
+    """Tests for GET /api/documents summary list"""
+
+    def test_list_has_no_heavy_fields(self, auth_headers):
+        """List must not ship extracted text, HTML or tables"""
+        response = requests.get(f"{BASE_URL}/api/documents", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert isinstance(data, list)
+        for doc in data:
+            assert "document_id" in doc
+            assert "status" in doc
+            for field in HEAVY_FIELDS:
+                assert field not in doc, f"{field} should not be part of the list"
+        print(f"SUCCESS: /api/documents returned {len(data)} summaries")
+
+    def test_status_filter(self, auth_headers):
+        """Only documents with the requested status are returned"""
+        response = requests.get(f"{BASE_URL}/api/documents", params={"status": "completed"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert all(doc["status"] == "completed" for doc in response.json())
+
+    def test_since_filter(self, auth_headers):
+        """Documents created before 'since' are excluded"""
+        response = requests.get(f"{BASE_URL}/api/documents", params={"since": "2100-01-01T00:00:00+00:00"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_cursor_pagination(self, auth_headers):
+        """Pages follow each other without overlap"""
+        first = requests.get(f"{BASE_URL}/api/documents", params={"limit": 1}, headers=auth_headers)
+        assert first.status_code == 200
+        cursor = first.headers.get("X-Next-Cursor")
+        if not cursor:
+            pytest.skip("Need at least two documents to test pagination")
+
+        second = requests.get(f"{BASE_URL}/api/documents", params={"limit": 1, "cursor": cursor}, headers=auth_headers)
+        assert second.status_code == 200
+        assert len(second.json()) == 1
+        assert second.json()[0]["document_id"] != first.json()[0]["document_id"]
+
+    def test_invalid_cursor(self, auth_headers):
+        response = requests.get(f"{BASE_URL}/api/documents", params={"cursor": "!!!"}, headers=auth_headers)
+        assert response.status_code == 400
+
+
+class TestDocumentSubResources:
+    """Tests for per-document content sub-resources"""
+
+    @pytest.fixture
+    def completed_doc(self, auth_headers):
+        response = requests.get(f"{BASE_URL}/api/documents", params={"status": "completed", "limit": 1}, headers=auth_headers)
+        docs = response.json()
+        if not docs:
+            pytest.skip("No completed document available")
+        return docs[0]
+
+    def test_text(self, auth_headers, completed_doc):
+        response = requests.get(f"{BASE_URL}/api/documents/{completed_doc['document_id']}/text", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["extracted_text"]
+
+    def test_html(self, auth_headers, completed_doc):
+        response = requests.get(f"{BASE_URL}/api/documents/{completed_doc['document_id']}/html", headers=auth_headers)
+        assert response.status_code == 200
+        assert "pdf-page" in response.json()["html_content"]
+
+    def test_tables(self, auth_headers, completed_doc):
+        response = requests.get(f"{BASE_URL}/api/documents/{completed_doc['document_id']}/tables", headers=auth_headers)
+        assert response.status_code == 200
+        assert isinstance(response.json()["tables"], list)
+
+    def test_unknown_document(self, auth_headers):
+        response = requests.get(f"{BASE_URL}/api/documents/doc_nonexistent123/text", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_requires_auth(self):
+        response = requests.get(f"{BASE_URL}/api/documents/doc_nonexistent123/text")
+        assert response.status_code == 401
+
+
+class TestDocumentEvents:
+    """Tests for the SSE status stream"""
+
+    def test_stream_starts_with_ready_event(self, auth_headers):
+        with requests.get(f"{BASE_URL}/api/documents/events", headers=auth_headers, stream=True, timeout=10) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            lines = []
+            for line in response.iter_lines(decode_unicode=True):
+                lines.append(line)
+                if line.startswith("data:"):
+                    break
+            assert "event: ready" in lines
+            assert any(line.startswith("id: ") for line in lines)
+
+    def test_resume_with_last_event_id(self, auth_headers):
+        """A reconnect with Last-Event-ID is accepted and does not repeat the ready event"""
+        headers = {**auth_headers, "Last-Event-ID": "0"}
+        with requests.get(f"{BASE_URL}/api/documents/events", headers=headers, stream=True, timeout=10) as response:
+            assert response.status_code == 200
+            first = next(response.iter_lines(decode_unicode=True))
+            assert first == "retry: 3000"
+
+    def test_requires_auth(self):
+        response = requests.get(f"{BASE_URL}/api/documents/events", timeout=10)
+        assert response.status_code == 401
+
+
+class TestPdfEmbedStreaming:
+    """Tests for Range/ETag support on the PDF embed endpoint"""
+
+    @pytest.fixture
+    def pdf_url(self, auth_headers):
+        response = requests.get(f"{BASE_URL}/api/documents", params={"limit": 1}, headers=auth_headers)
+        docs = response.json()
+        if not docs:
+            pytest.skip("No document available")
+        return f"{BASE_URL}/api/documents/{docs[0]['document_id']}/pdf-embed"
+
+    def test_full_response_advertises_ranges(self, pdf_url):
+        response = requests.get(pdf_url)
+        assert response.status_code == 200
+        assert response.headers.get("accept-ranges") == "bytes"
+        assert response.headers.get("etag")
+        assert response.content.startswith(b"%PDF")
+
+    def test_byte_range(self, pdf_url):
+        response = requests.get(pdf_url, headers={"Range": "bytes=0-3"})
+        assert response.status_code == 206
+        assert response.content == b"%PDF"
+        assert response.headers["content-range"].startswith("bytes 0-3/")
+
+    def test_unsatisfiable_range(self, pdf_url):
+        response = requests.get(pdf_url, headers={"Range": "bytes=999999999-"})
+        assert response.status_code == 416
+
+    def test_if_none_match(self, pdf_url):
+        etag = requests.get(pdf_url).headers["etag"]
+        response = requests.get(pdf_url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+
+class TestImageServing:
+    """Tests for conditional GET on uploaded images"""
+
+    @pytest.fixture(scope="class")
+    def image(self, auth_headers):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new("RGB", (1000, 600), (30, 90, 160)).save(buffer, "PNG")
+        response = requests.post(
+            f"{BASE_URL}/api/images/upload",
+            files={"file": ("TEST_image.png", buffer.getvalue(), "image/png")},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["width"] == 1000
+        assert "320w" in data["srcset"]
+        return {"url": f"{BASE_URL}{data['url']}", "content": buffer.getvalue()}
+
+    def test_image_has_strong_etag(self, image):
+        response = requests.get(image["url"])
+        assert response.status_code == 200
+        assert response.content == image["content"]
+        assert response.headers["etag"].startswith('"')
+
+    def test_if_none_match(self, image):
+        etag = requests.get(image["url"]).headers["etag"]
+        response = requests.get(image["url"], headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_resized_webp_variant(self, image):
+        from PIL import Image
+        response = requests.get(image["url"], params={"w": 500, "format": "webp"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert Image.open(io.BytesIO(response.content)).size == (800, 480)
+
+    def test_invalid_format(self, image):
+        response = requests.get(image["url"], params={"format": "bmp"})
+        assert response.status_code == 400
+
+    def test_unknown_image(self):
+        response = requests.get(f"{BASE_URL}/api/images/img_nonexistent123")
+        assert response.status_code == 404
+
+
+class TestUploadSizeLimit:
+    """Oversize PDF uploads are rejected with 413"""
+
+    def test_declared_length_rejected_before_body(self, auth_headers):
+        """The middleware answers from the headers alone; no body is sent"""
+        url = urlsplit(BASE_URL)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(url.netloc, timeout=10)
+        try:
+            connection.putrequest("POST", f"{url.path}/api/documents/upload")
+            connection.putheader("Authorization", auth_headers["Authorization"])
+            connection.putheader("Content-Type", "multipart/form-data; boundary=x")
+            connection.putheader("Content-Length", str(MAX_PDF_UPLOAD_BYTES * 2))
+            connection.endheaders()
+            response = connection.getresponse()
+            assert response.status == 413
+            assert "maximal" in response.read().decode()
+        finally:
+            connection.close()
+
+    def test_streamed_upload_over_limit(self, auth_headers):
+        """Without Content-Length (chunked) the limit applies while the file is copied to disk"""
+        boundary = uuid.uuid4().hex
+        chunk = b"\0" * (1024 * 1024)
+
+        def body():
+            yield (
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"TEST_oversize.pdf\"\r\n"
+                "Content-Type: application/pdf\r\n\r\n%PDF-1.4\n"
+            ).encode()
+            for _ in range(MAX_PDF_UPLOAD_BYTES // len(chunk) + 1):
+                yield chunk
+            yield f"\r\n--{boundary}--\r\n".encode()
+
+        response = requests.post(
+            f"{BASE_URL}/api/documents/upload",
+            data=body(),
+            headers={**auth_headers, "Content-Type": f"multipart/form-data; boundary={boundary}"},
+            timeout=120
+        )
+        assert response.status_code == 413
+        documents = requests.get(f"{BASE_URL}/api/documents", params={"limit": 100}, headers=auth_headers).json()
+        assert "TEST_oversize.pdf" not in [doc["filename"] for doc in documents]
+
+
+class TestSharedPdfStorage:
+    """Identical uploads are stored once and extracted once"""
+
+    @pytest.fixture
+    def upload(self, auth_headers):
+        created = []
+
+        def upload(content):
+            response = requests.post(
+                f"{BASE_URL}/api/documents/upload",
+                files={"file": (f"TEST_blob_{uuid.uuid4().hex[:8]}.pdf", content, "application/pdf")},
+                headers=auth_headers
+            )
+            assert response.status_code == 200, response.text
+            created.append(response.json()["document_id"])
+            return response.json()
+
+        yield upload
+        for document_id in created:
+            requests.delete(f"{BASE_URL}/api/documents/{document_id}", headers=auth_headers)
+
+    def wait_until_completed(self, auth_headers, document_id):
+        for _ in range(60):
+            doc = requests.get(f"{BASE_URL}/api/documents/{document_id}", headers=auth_headers).json()
+            if doc["status"] in ("completed", "failed"):
+                break
+            time.sleep(0.5)
+        assert doc["status"] == "completed", doc.get("error_message")
+        return doc
+
+    @pytest.fixture
+    def shared(self, auth_headers, upload):
+        """Two documents uploaded with the same bytes"""
+        content = pdf_bytes(f"Gemeinsame Datei {uuid.uuid4().hex}")
+        first = upload(content)
+        self.wait_until_completed(auth_headers, first["document_id"])
+        second = upload(content)
+        return content, first, second
+
+    def test_identical_bytes_reuse_extraction(self, auth_headers, shared):
+        content, first, second = shared
+        assert second["status"] == "completed"
+        assert second["message"] == "Dokument bereits verarbeitet"
+        docs = [
+            requests.get(f"{BASE_URL}/api/documents/{doc['document_id']}", headers=auth_headers).json()
+            for doc in (first, second)
+        ]
+        assert docs[0]["file_path"] == docs[1]["file_path"]
+        assert docs[1]["extraction_reused"] is True
+        assert docs[1]["extracted_text"] == docs[0]["extracted_text"]
+
+    def test_deleting_one_keeps_shared_file(self, auth_headers, shared):
+        content, first, second = shared
+        response = requests.delete(f"{BASE_URL}/api/documents/{first['document_id']}", headers=auth_headers)
+        assert response.status_code == 200
+        response = requests.get(f"{BASE_URL}/api/documents/{second['document_id']}/pdf-embed")
+        assert response.status_code == 200
+        assert response.content == content
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
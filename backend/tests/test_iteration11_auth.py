@@ -0,0 +1,175 @@
+"""
+Iteration 11: Authentication performance
+1. Session cache - role/block/password/delete/logout take effect immediately
+2. Password hashing off the event loop - login latency metric
+3. Signed session tokens (SESSION_SIGNING_KEY) - tampering, logout, stale tokens after user changes
+"""
+import base64
+import json
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+ADMIN_EMAIL = "marc.hansen@canusa.de"
+ADMIN_PASSWORD = "CanusaNexus2024!"
+
+
+def login(email, password):
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": email, "password": password, "stay_logged_in": False}
+    )
+    assert response.status_code == 200, f"Login failed: {response.text}"
+    return response.cookies.get("session_token")
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    return bearer(login(ADMIN_EMAIL, ADMIN_PASSWORD))
+
+
+@pytest.fixture
+def test_user(admin_headers):
+    """Create a throwaway editor and delete it afterwards"""
+    email = f"test_auth_{uuid.uuid4().hex[:8]}@example.com"
+    response = requests.post(
+        f"{BASE_URL}/api/users",
+        json={"email": email, "password": "Secret123!", "name": "TEST Auth", "role": "editor"},
+        headers=admin_headers
+    )
+    assert response.status_code == 200
+    user = {**response.json(), "email": email, "password": "Secret123!"}
+    yield user
+    requests.delete(f"{BASE_URL}/api/users/{user['user_id']}", headers=admin_headers)
+
+
+class TestSessionInvalidation:
+    """Cached sessions must never outlive the change that invalidates them"""
+
+    def _warm(self, token):
+        for _ in range(3):
+            assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).status_code == 200
+
+    def test_role_change_is_visible_immediately(self, admin_headers, test_user):
+        token = login(test_user["email"], test_user["password"])
+        self._warm(token)
+        response = requests.put(
+            f"{BASE_URL}/api/users/{test_user['user_id']}/role",
+            json={"role": "viewer"},
+            headers=admin_headers
+        )
+        assert response.status_code == 200
+        me = requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token))
+        assert me.json()["role"] == "viewer"
+
+    def test_block_revokes_session(self, admin_headers, test_user):
+        token = login(test_user["email"], test_user["password"])
+        self._warm(token)
+        requests.put(f"{BASE_URL}/api/users/{test_user['user_id']}/block", headers=admin_headers)
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).status_code in (401, 403)
+
+    def test_password_change_revokes_session(self, admin_headers, test_user):
+        token = login(test_user["email"], test_user["password"])
+        self._warm(token)
+        requests.put(
+            f"{BASE_URL}/api/users/{test_user['user_id']}/password",
+            json={"new_password": "Another123!"},
+            headers=admin_headers
+        )
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).status_code == 401
+
+    def test_delete_revokes_session(self, admin_headers, test_user):
+        token = login(test_user["email"], test_user["password"])
+        self._warm(token)
+        requests.delete(f"{BASE_URL}/api/users/{test_user['user_id']}", headers=admin_headers)
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).status_code == 401
+
+    def test_logout_revokes_session(self, test_user):
+        token = login(test_user["email"], test_user["password"])
+        self._warm(token)
+        requests.post(f"{BASE_URL}/api/auth/logout", cookies={"session_token": token})
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).status_code == 401
+
+    def test_metrics_report_session_cache(self, admin_headers):
+        response = requests.get(f"{BASE_URL}/api/metrics", headers=admin_headers)
+        assert response.status_code == 200
+        assert "hit_rate" in response.json()["session_cache"]
+
+
+class TestPasswordHashing:
+    """bcrypt runs in a bounded pool; login latency is reported"""
+
+    def test_wrong_password_still_rejected(self):
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"email": ADMIN_EMAIL, "password": "wrong-password"}
+        )
+        assert response.status_code == 401
+
+    def test_metrics_report_login_latency(self, admin_headers):
+        data = requests.get(f"{BASE_URL}/api/metrics", headers=admin_headers).json()
+        assert data["login_latency"]["count"] >= 1
+        assert data["password_hashing"]["workers"] >= 1
+        assert "rejected" in data["password_hashing"]
+
+
+class TestSignedSessionTokens:
+    """HMAC-signed "v1." tokens are validated without the database but still revocable"""
+
+    @pytest.fixture(autouse=True)
+    def signing_enabled(self, admin_headers):
+        tokens = requests.get(f"{BASE_URL}/api/metrics", headers=admin_headers).json()["session_tokens"]
+        if not tokens["signed"]:
+            pytest.skip("SESSION_SIGNING_KEY not configured")
+
+    def test_login_issues_signed_token(self, test_user):
+        token = login(test_user["email"], test_user["password"])
+        assert token.startswith("v1.")
+        me = requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token))
+        assert me.status_code == 200
+        assert me.json()["user_id"] == test_user["user_id"]
+
+    def test_tampered_payload_rejected(self, test_user):
+        token = login(test_user["email"], test_user["password"])
+        body, signature = token[len("v1."):].split(".")
+        payload = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+        forged = base64.urlsafe_b64encode(json.dumps({**payload, "role": "admin"}).encode()).rstrip(b"=").decode()
+        response = requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(f"v1.{forged}.{signature}"))
+        assert response.status_code == 401
+
+    def test_logout_revokes_signed_token(self, admin_headers, test_user):
+        token = login(test_user["email"], test_user["password"])
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).status_code == 200
+        requests.post(f"{BASE_URL}/api/auth/logout", cookies={"session_token": token})
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).status_code == 401
+        tokens = requests.get(f"{BASE_URL}/api/metrics", headers=admin_headers).json()["session_tokens"]
+        assert tokens["revoked_sessions"] >= 1
+
+    def test_user_change_makes_tokens_stale(self, admin_headers, test_user):
+        """A token issued before a role change is re-checked against the database"""
+        token = login(test_user["email"], test_user["password"])
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).json()["role"] == "editor"
+        requests.put(
+            f"{BASE_URL}/api/users/{test_user['user_id']}/role",
+            json={"role": "viewer"},
+            headers=admin_headers
+        )
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).json()["role"] == "viewer"
+        tokens = requests.get(f"{BASE_URL}/api/metrics", headers=admin_headers).json()["session_tokens"]
+        assert tokens["stale_users"] >= 1
+
+    def test_blocked_user_token_rejected(self, admin_headers, test_user):
+        token = login(test_user["email"], test_user["password"])
+        requests.put(f"{BASE_URL}/api/users/{test_user['user_id']}/block", headers=admin_headers)
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=bearer(token)).status_code in (401, 403)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,574 @@
+"""
+Iteration 12: Search performance
+1. Search engines (MongoDB text index / in-process BM25F) follow article create/update/delete
+2. POST /api/search, GET /api/search/quick, GET /api/widget/search on the configured engine
+3. Search latency and index statistics in GET /api/metrics
+4. Category names from the category cache in search results and article lists
+5. GET /api/search/quick - Title prefix autocomplete ranked by view_count
+6. German analysis - umlaut/ae folding, stemming, compound splitting, stop words
+7. Typo tolerance - misspelt terms matched through the trigram index (SEARCH_ENGINE=index)
+8. POST /api/search?mode=semantic|hybrid - Vector similarity search (SEARCH_ENGINE=index)
+9. Search result cache - repeated queries, invalidation by article writes, hit rate in GET /api/metrics
+10. Excerpts - highlighted passages from the plain text and sentences precomputed on save
+11. Facets - match counts by category, status and tag; status/tag drill-down filters
+12. Ranking - field weights (title > summary > content), short terms such as "EU"
+13. Vector snapshot - vectors saved to the snapshot file are mapped from it instead of kept in memory
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+ADMIN_EMAIL = "marc.hansen@canusa.de"
+ADMIN_PASSWORD = "CanusaNexus2024!"
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Login as admin and return auth headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD, "stay_logged_in": False}
+    )
+    assert response.status_code == 200, f"Admin login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.cookies.get('session_token')}"}
+
+
+@pytest.fixture
+def article(auth_headers):
+    """Published article with a term no other article contains; deleted afterwards"""
+    term = f"zeppelin{uuid.uuid4().hex[:8]}"
+    response = requests.post(
+        f"{BASE_URL}/api/articles",
+        json={
+            "title": f"TEST_search {term} Rundflug",
+            "content": f"<p>Buchung eines <b>{term}</b> Rundflugs über den Bodensee.</p>",
+            "summary": "Rundflug am Bodensee",
+            "status": "published",
+            "tags": ["rundflug"]
+        },
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    created = {**response.json(), "term": term}
+    yield created
+    requests.delete(f"{BASE_URL}/api/articles/{created['article_id']}", headers=auth_headers)
+
+
+def search_ids(auth_headers, query):
+    response = requests.post(f"{BASE_URL}/api/search", json={"query": query, "top_k": 10}, headers=auth_headers)
+    assert response.status_code == 200
+    return [result["article_id"] for result in response.json()["results"]]
+
+
+def search_engine(auth_headers):
+    """Engine searches use right now; "loading" while the in-process index is built"""
+    search = requests.get(f"{BASE_URL}/api/metrics", headers=auth_headers).json()["search"]
+    if search["engine"] == "index" and not search["index"]["ready"]:
+        return "loading"
+    return search["engine"]
+
+
+class TestSearchFollowsArticles:
+    """Whatever the engine, search reflects article changes immediately"""
+
+    def test_created_article_is_found(self, auth_headers, article):
+        assert search_ids(auth_headers, article["term"])[0] == article["article_id"]
+
+    def test_updated_article_is_found_by_new_title(self, auth_headers, article):
+        new_term = f"luftschiff{uuid.uuid4().hex[:8]}"
+        response = requests.put(
+            f"{BASE_URL}/api/articles/{article['article_id']}",
+            json={"title": f"TEST_search {new_term}", "content": "<p>Neuer Inhalt</p>"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert article["article_id"] in search_ids(auth_headers, new_term)
+        assert article["article_id"] not in search_ids(auth_headers, article["term"])
+
+    def test_deleted_article_is_not_found(self, auth_headers, article):
+        requests.delete(f"{BASE_URL}/api/articles/{article['article_id']}", headers=auth_headers)
+        assert article["article_id"] not in search_ids(auth_headers, article["term"])
+
+    def test_quick_search(self, auth_headers, article):
+        response = requests.get(
+            f"{BASE_URL}/api/search/quick", params={"q": article["term"]}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["results"][0]["article_id"] == article["article_id"]
+
+    def test_widget_search_only_published(self, auth_headers, article):
+        response = requests.get(f"{BASE_URL}/api/widget/search", params={"q": article["term"]})
+        assert [r["article_id"] for r in response.json()["results"]] == [article["article_id"]]
+        requests.put(
+            f"{BASE_URL}/api/articles/{article['article_id']}",
+            json={"status": "draft"},
+            headers=auth_headers
+        )
+        response = requests.get(f"{BASE_URL}/api/widget/search", params={"q": article["term"]})
+        assert response.json()["results"] == []
+
+    def test_metrics_report_search(self, auth_headers, article):
+        search_ids(auth_headers, article["term"])
+        data = requests.get(f"{BASE_URL}/api/metrics", headers=auth_headers).json()["search"]
+        assert data["engine"] in ("mongo", "index")
+        assert data["latency"]["count"] >= 1
+        if data["engine"] == "index":
+            assert data["index"]["documents"] >= 1
+
+
+class TestCategoryNames:
+    """category_name comes from the cached category map and follows renames immediately"""
+
+    @pytest.fixture
+    def category(self, auth_headers):
+        response = requests.post(
+            f"{BASE_URL}/api/categories", json={"name": "TEST_search Kategorie"}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        created = response.json()
+        yield created
+        requests.delete(f"{BASE_URL}/api/categories/{created['category_id']}", headers=auth_headers)
+
+    def test_search_and_lists_follow_rename(self, auth_headers, article, category):
+        requests.put(
+            f"{BASE_URL}/api/articles/{article['article_id']}",
+            json={"category_id": category["category_id"]},
+            headers=auth_headers
+        )
+        # Warm the cache, then rename
+        requests.post(f"{BASE_URL}/api/search", json={"query": article["term"]}, headers=auth_headers)
+        response = requests.put(
+            f"{BASE_URL}/api/categories/{category['category_id']}",
+            json={"name": "TEST_search Umbenannt"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+
+        results = requests.post(
+            f"{BASE_URL}/api/search", json={"query": article["term"]}, headers=auth_headers
+        ).json()["results"]
+        assert results[0]["category_name"] == "TEST_search Umbenannt"
+        quick = requests.get(
+            f"{BASE_URL}/api/search/quick", params={"q": article["term"]}, headers=auth_headers
+        ).json()["results"]
+        assert quick[0]["category_name"] == "TEST_search Umbenannt"
+        listed = requests.get(
+            f"{BASE_URL}/api/articles", params={"category_id": category["category_id"]}, headers=auth_headers
+        ).json()
+        assert [a["category_name"] for a in listed] == ["TEST_search Umbenannt"]
+
+    def test_deleted_category_has_no_name(self, auth_headers, article, category):
+        requests.put(
+            f"{BASE_URL}/api/articles/{article['article_id']}",
+            json={"category_id": category["category_id"]},
+            headers=auth_headers
+        )
+        requests.delete(f"{BASE_URL}/api/categories/{category['category_id']}", headers=auth_headers)
+        quick = requests.get(
+            f"{BASE_URL}/api/search/quick", params={"q": article["term"]}, headers=auth_headers
+        ).json()["results"]
+        assert quick[0]["category_name"] is None
+
+
+
+class TestAutocomplete:
+    """Quick search matches title word prefixes, never interprets input as a pattern"""
+
+    def quick(self, auth_headers, q):
+        response = requests.get(f"{BASE_URL}/api/search/quick", params={"q": q, "limit": 5}, headers=auth_headers)
+        assert response.status_code == 200
+        return [result["article_id"] for result in response.json()["results"]]
+
+    def test_prefix_of_every_word(self, auth_headers, article):
+        term = article["term"]
+        assert self.quick(auth_headers, term[:12] + "  RUND") == [article["article_id"]]
+        assert self.quick(auth_headers, term[:12] + " bodensee") == []
+
+    def test_regex_input_is_literal(self, auth_headers, article):
+        assert self.quick(auth_headers, ".*") == []
+        assert self.quick(auth_headers, "(a+)+$") == []
+
+    def test_most_viewed_first(self, auth_headers, article):
+        second = requests.post(
+            f"{BASE_URL}/api/articles",
+            json={"title": f"TEST_search {article['term']} Nachtflug", "content": "<p>x</p>"},
+            headers=auth_headers
+        ).json()
+        try:
+            for _ in range(3):
+                requests.post(f"{BASE_URL}/api/articles/{second['article_id']}/viewed", headers=auth_headers)
+            assert self.quick(auth_headers, article["term"]) == [second["article_id"], article["article_id"]]
+        finally:
+            requests.delete(f"{BASE_URL}/api/articles/{second['article_id']}", headers=auth_headers)
+
+    def test_prefixes_not_exposed(self, auth_headers, article):
+        response = requests.get(f"{BASE_URL}/api/articles/{article['article_id']}", headers=auth_headers)
+        assert "title_prefixes" not in response.json()
+
+
+
+class TestGermanAnalysis:
+    """Articles and queries go through the same German analyzer"""
+
+    @pytest.fixture
+    def german_article(self, auth_headers):
+        response = requests.post(
+            f"{BASE_URL}/api/articles",
+            json={
+                "title": "TEST_search Fahrräder für Familien",
+                "content": "<p>Die Reiseversicherung deckt Schäden an Mietfahrrädern ab.</p>",
+                "status": "published"
+            },
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        created = response.json()
+        yield created
+        requests.delete(f"{BASE_URL}/api/articles/{created['article_id']}", headers=auth_headers)
+
+    def ids(self, auth_headers, query):
+        response = requests.post(f"{BASE_URL}/api/search", json={"query": query, "top_k": 50}, headers=auth_headers)
+        assert response.status_code == 200
+        return [result["article_id"] for result in response.json()["results"]]
+
+    @pytest.mark.parametrize("query", ["Fahrrader", "fahrraeder", "FAHRRAD"])
+    def test_umlaut_and_inflection_variants(self, auth_headers, german_article, query):
+        assert german_article["article_id"] in self.ids(auth_headers, query)
+
+    def test_compound_part_matches(self, auth_headers, german_article):
+        assert german_article["article_id"] in self.ids(auth_headers, "Versicherung")
+
+    def test_stop_words_only(self, auth_headers, german_article):
+        assert self.ids(auth_headers, "die für und") == []
+
+    def test_search_terms_not_exposed(self, auth_headers, german_article):
+        response = requests.get(f"{BASE_URL}/api/articles/{german_article['article_id']}", headers=auth_headers)
+        assert "search" not in response.json()
+
+
+class TestTypoTolerance:
+    """With the in-process index, misspelt terms find the words they were meant to be"""
+
+    @pytest.fixture
+    def destination(self, auth_headers):
+        if search_engine(auth_headers) != "index":
+            pytest.skip("Typo tolerance needs SEARCH_ENGINE=index")
+        response = requests.post(
+            f"{BASE_URL}/api/articles",
+            json={
+                "title": "TEST_search Mietwagenrundreise Vancouver",
+                "content": "<p>Von Vancouver in den Yellowstone Nationalpark.</p>",
+                "status": "published",
+                "tags": ["Kanada"]
+            },
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        created = response.json()
+        yield created
+        requests.delete(f"{BASE_URL}/api/articles/{created['article_id']}", headers=auth_headers)
+
+    @pytest.mark.parametrize("query", ["Vancover", "Yelowstone", "Kandaa", "Vancouver Nationalprak"])
+    def test_misspelt_terms(self, auth_headers, destination, query):
+        assert destination["article_id"] in search_ids(auth_headers, query)
+
+    def test_widget_search(self, destination):
+        response = requests.get(f"{BASE_URL}/api/widget/search", params={"q": "Yellowstnoe", "limit": 50})
+        assert destination["article_id"] in [r["article_id"] for r in response.json()["results"]]
+
+    def test_short_terms_are_not_corrected(self, auth_headers, destination):
+        # "kan" would be one edit from many words
+        assert destination["article_id"] not in search_ids(auth_headers, "kan")
+
+    def test_metrics_count_corrections(self, auth_headers, destination):
+        before = requests.get(f"{BASE_URL}/api/metrics", headers=auth_headers).json()["search"]
+        search_ids(auth_headers, "Vancover")
+        after = requests.get(f"{BASE_URL}/api/metrics", headers=auth_headers).json()["search"]
+        assert after["typo_corrections"] > before["typo_corrections"]
+        assert after["index"]["vocabulary"]["terms"] >= 1
+
+
+class TestSemanticSearch:
+    """Vector search finds related words the keyword search can't; hybrid merges both"""
+
+    def search(self, auth_headers, query, mode, **body):
+        response = requests.post(
+            f"{BASE_URL}/api/search", params={"mode": mode}, json={"query": query, "top_k": 10, **body}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_unknown_mode(self, auth_headers):
+        response = requests.post(
+            f"{BASE_URL}/api/search", params={"mode": "magic"}, json={"query": "Flug"}, headers=auth_headers
+        )
+        assert response.status_code == 400
+
+    def test_related_word(self, auth_headers, article):
+        if search_engine(auth_headers) != "index":
+            pytest.skip("Semantic search needs SEARCH_ENGINE=index")
+        # Shares most letters with the article's term, but is too far off for typo correction
+        query = f"{article['term']}flotte"
+        assert article["article_id"] not in [r["article_id"] for r in self.search(auth_headers, query, "keyword")["results"]]
+        data = self.search(auth_headers, query, "semantic")
+        assert data["mode"] == "semantic"
+        assert data["results"][0]["article_id"] == article["article_id"]
+        assert 0 < data["results"][0]["score"] <= 1
+
+    def test_hybrid(self, auth_headers, article):
+        data = self.search(auth_headers, f"{article['term']} Rundflug", "hybrid")
+        # Without the in-process index every mode is a keyword search
+        assert data["mode"] == ("hybrid" if search_engine(auth_headers) == "index" else "keyword")
+        assert data["results"][0]["article_id"] == article["article_id"]
+        assert all(0 < r["score"] <= 1 for r in data["results"])
+
+    def test_category_filter(self, auth_headers, article):
+        if search_engine(auth_headers) != "index":
+            pytest.skip("Semantic search needs SEARCH_ENGINE=index")
+        data = self.search(auth_headers, article["term"], "semantic", category_id="no-such-category")
+        assert data["results"] == []
+
+    def test_follows_updates(self, auth_headers, article):
+        if search_engine(auth_headers) != "index":
+            pytest.skip("Semantic search needs SEARCH_ENGINE=index")
+        requests.delete(f"{BASE_URL}/api/articles/{article['article_id']}", headers=auth_headers)
+        results = self.search(auth_headers, article["term"], "semantic")["results"]
+        assert article["article_id"] not in [r["article_id"] for r in results]
+        metrics = requests.get(f"{BASE_URL}/api/metrics", headers=auth_headers).json()["search"]["index"]
+        assert metrics["vectors"]["dimensions"] > 0
+
+
+class TestSearchCache:
+    """Repeated searches are served from the cache until an article changes"""
+
+    def cache_stats(self, auth_headers):
+        return requests.get(f"{BASE_URL}/api/metrics", headers=auth_headers).json()["search"]["cache"]
+
+    def test_normalised_query_is_a_hit(self, auth_headers, article):
+        search_ids(auth_headers, article["term"])
+        before = self.cache_stats(auth_headers)
+        assert search_ids(auth_headers, f"  {article['term'].upper()}! ")[0] == article["article_id"]
+        after = self.cache_stats(auth_headers)
+        assert after["hits"] == before["hits"] + 1
+        assert after["bytes"] > 0
+        assert 0 < after["hit_rate"] <= 1
+
+    def test_article_write_bumps_corpus_version(self, auth_headers, article):
+        search_ids(auth_headers, article["term"])
+        before = self.cache_stats(auth_headers)
+        requests.put(
+            f"{BASE_URL}/api/articles/{article['article_id']}",
+            json={"title": "TEST_search ohne Suchbegriff", "content": "<p>Neuer Inhalt</p>"},
+            headers=auth_headers
+        )
+        after = self.cache_stats(auth_headers)
+        assert after["corpus_version"] > before["corpus_version"]
+        assert article["article_id"] not in search_ids(auth_headers, article["term"])
+
+    def test_widget_scope_is_separate(self, auth_headers, article):
+        requests.put(f"{BASE_URL}/api/articles/{article['article_id']}", json={"status": "draft"}, headers=auth_headers)
+        assert search_ids(auth_headers, article["term"]) == [article["article_id"]]
+        response = requests.get(f"{BASE_URL}/api/widget/search", params={"q": article["term"]})
+        assert response.json()["results"] == []
+
+
+class TestExcerpts:
+    """content_snippet is the passage with the most query terms, highlights mark them"""
+
+    @pytest.fixture
+    def long_article(self, auth_headers):
+        term = f"ballon{uuid.uuid4().hex[:8]}"
+        filler = "".join(f"<p>Absatz {i} über Buchungen und Reisen.</p>" for i in range(100))
+        response = requests.post(
+            f"{BASE_URL}/api/articles",
+            json={
+                "title": "TEST_search Lange Anleitung",
+                "content": f"<h2>Einleitung</h2>{filler}<p>Die {term}fahrt &amp; der <b>{term}</b> Start sind wetterabhängig.</p>",
+                "summary": "Zusammenfassung"
+            },
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        created = {**response.json(), "term": term}
+        yield created
+        requests.delete(f"{BASE_URL}/api/articles/{created['article_id']}", headers=auth_headers)
+
+    def result(self, auth_headers, query):
+        response = requests.post(f"{BASE_URL}/api/search", json={"query": query}, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()["results"][0]
+
+    def test_matching_passage_highlighted(self, auth_headers, long_article):
+        result = self.result(auth_headers, long_article["term"])
+        assert result["article_id"] == long_article["article_id"]
+        snippet = result["content_snippet"]
+        assert snippet.startswith("...Die ")
+        assert "&amp;" not in snippet and "<b>" not in snippet
+        assert [snippet[start:end] for start, end in result["highlights"]] == [long_article["term"]]
+
+    def test_summary_without_match_in_content(self, auth_headers, long_article):
+        requests.put(
+            f"{BASE_URL}/api/articles/{long_article['article_id']}",
+            json={"title": f"TEST_search {long_article['term']}", "content": "<p>Kurz.</p>"},
+            headers=auth_headers
+        )
+        result = self.result(auth_headers, long_article["term"])
+        assert result["content_snippet"] == "Zusammenfassung"
+        assert result["highlights"] == []
+
+    def test_word_count_stored_text_hidden(self, auth_headers, long_article):
+        article = requests.get(f"{BASE_URL}/api/articles/{long_article['article_id']}", headers=auth_headers).json()
+        assert article["word_count"] == 1 + 100 * 6 + 7
+        assert "text" not in article
+        updated = requests.put(
+            f"{BASE_URL}/api/articles/{long_article['article_id']}",
+            json={"content": "<p>Drei kurze Wörter</p>"},
+            headers=auth_headers
+        ).json()
+        assert updated["word_count"] == 3
+        assert "text" not in updated
+
+
+class TestFacets:
+    """facets counts all matching articles by category, status and tag, within the filters"""
+
+    @pytest.fixture
+    def articles(self, auth_headers):
+        term = f"kajak{uuid.uuid4().hex[:8]}"
+        created = []
+        for status, tags in (("published", ["paddeln", "kanada"]), ("published", ["paddeln"]), ("draft", ["kanada"])):
+            response = requests.post(
+                f"{BASE_URL}/api/articles",
+                json={"title": f"TEST_search {term} Tour", "content": "<p>Paddeltour</p>", "status": status, "tags": tags},
+                headers=auth_headers
+            )
+            assert response.status_code == 200
+            created.append(response.json())
+        yield term, created
+        for art in created:
+            requests.delete(f"{BASE_URL}/api/articles/{art['article_id']}", headers=auth_headers)
+
+    def search(self, auth_headers, query, **filters):
+        response = requests.post(f"{BASE_URL}/api/search", json={"query": query, **filters}, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()
+
+    @staticmethod
+    def counts(facet):
+        return {entry["value"]: entry["count"] for entry in facet}
+
+    def test_counts_by_status_and_tag(self, auth_headers, articles):
+        if search_engine(auth_headers) == "loading":
+            pytest.skip("Search index still loading")
+        term, created = articles
+        data = self.search(auth_headers, term)
+        assert len(data["results"]) == 3
+        assert self.counts(data["facets"]["status"]) == {"published": 2, "draft": 1}
+        assert self.counts(data["facets"]["tags"]) == {"paddeln": 2, "kanada": 2}
+        assert data["facets"]["category"] == [{"value": None, "name": None, "count": 3}]
+
+    def test_drill_down(self, auth_headers, articles):
+        if search_engine(auth_headers) == "loading":
+            pytest.skip("Search index still loading")
+        term, created = articles
+        data = self.search(auth_headers, term, status="published", tag="kanada")
+        assert [result["article_id"] for result in data["results"]] == [created[0]["article_id"]]
+        assert self.counts(data["facets"]["tags"]) == {"paddeln": 1, "kanada": 1}
+
+    def test_empty_query(self, auth_headers):
+        data = self.search(auth_headers, "a")
+        assert data["facets"] == {"category": [], "status": [], "tags": []}
+
+
+class TestRanking:
+    """Matches count more in the title than in the summary, more there than in the content"""
+
+    @pytest.fixture
+    def create(self, auth_headers):
+        created = []
+
+        def create(**fields):
+            response = requests.post(
+                f"{BASE_URL}/api/articles",
+                json={"status": "published", "content": "<p>Nichts weiter.</p>", **fields},
+                headers=auth_headers
+            )
+            assert response.status_code == 200
+            created.append(response.json()["article_id"])
+            return created[-1]
+
+        yield create
+        for article_id in created:
+            requests.delete(f"{BASE_URL}/api/articles/{article_id}", headers=auth_headers)
+
+    def test_field_weights(self, auth_headers, create):
+        term = f"kanu{uuid.uuid4().hex[:8]}"
+        in_content = create(title="TEST_search Inhalt", content=f"<p>Ein {term} im Text.</p>")
+        in_summary = create(title="TEST_search Zusammenfassung", summary=f"Alles über {term}")
+        in_title = create(title=f"TEST_search {term}")
+        assert search_ids(auth_headers, term) == [in_title, in_summary, in_content]
+
+    def test_short_term(self, auth_headers, create):
+        """Two-letter terms are neither dropped nor stemmed away"""
+        article_id = create(title="TEST_search EU-Richtlinie Pauschalreisen", content="<p>Vorgaben der EU.</p>")
+        response = requests.post(f"{BASE_URL}/api/search", json={"query": "EU", "top_k": 100}, headers=auth_headers)
+        assert response.status_code == 200
+        assert article_id in [result["article_id"] for result in response.json()["results"]]
+
+
+class TestVectorSnapshot:
+    """After a save the vectors are served from the written file, not the in-memory overlay"""
+
+    @pytest.fixture
+    def vectors(self):
+        np = pytest.importorskip("numpy")
+        vector_index = pytest.importorskip("vector_index")
+        rng = np.random.default_rng(12)
+        index = vector_index.VectorIndex(dimensions=16)
+        for n in range(50):
+            index.add(f"art_{n}", rng.standard_normal(16).astype(np.float32))
+        return vector_index, index, rng
+
+    def test_recent_mapped_after_save(self, vectors, tmp_path):
+        vector_index, index, _ = vectors
+        path = str(tmp_path / "articles.vec")
+        before = index.search(index._recent["art_7"], limit=5)
+        assert index.stats()["recent"] == 50
+
+        snapshot = index.snapshot()
+        vector_index.write_vectors(path, snapshot)
+        assert index.remap(path, snapshot)
+        assert index.stats()["recent"] == 0
+        assert index.stats()["mapped"] == 50
+        assert index.search(index._matrix[index._rows["art_7"]], limit=5) == before
+
+    def test_changes_during_save_stay_recent(self, vectors, tmp_path):
+        vector_index, index, rng = vectors
+        path = str(tmp_path / "articles.vec")
+        snapshot = index.snapshot()
+        # Changed while the file was being written
+        changed = rng.standard_normal(16).astype("float32")
+        index.add("art_1", changed)
+        index.remove("art_2")
+        vector_index.write_vectors(path, snapshot)
+        assert index.remap(path, snapshot)
+
+        assert index.stats()["recent"] == 1
+        assert "art_2" not in index and len(index) == 49
+        assert index.search(changed, limit=1)[0][0] == "art_1"
+
+    def test_file_replaced_by_other_writer(self, vectors, tmp_path):
+        vector_index, index, _ = vectors
+        path = str(tmp_path / "articles.vec")
+        snapshot = index.snapshot()
+        vector_index.write_vectors(path, snapshot)
+        vector_index.write_vectors(path, index.snapshot())
+        assert not index.remap(path, snapshot)
+        assert index.stats()["recent"] == 50
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
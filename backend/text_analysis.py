@@ -0,0 +1,265 @@
+"""German text analysis shared by the search code.
+
+Article content is stored as HTML from the editor; everything that indexes or
+matches text works on the plain text produced by html_to_text.
+
+analyze() turns text into search terms and is applied identically to articles
+(once, when they are saved) and to queries:
+- Unicode NFKC normalisation and case folding (ß becomes ss),
+- stop words removed,
+- ae/oe/ue treated as ä/ö/ü, umlauts folded away after stemming, so
+  "Fahrrader", "Fahrraeder" and "Fahrräder" all become "fahrrad",
+- Snowball German stemming,
+- compounds split against a dictionary of known words, so
+  "Reiseversicherung" also yields the terms of "Reise" and "Versicherung".
+
+Changing any of this changes the stored terms: bump ANALYZER_VERSION and add a
+migration that re-analyzes the articles.
+
+edge_ngrams turns a title into the word prefixes the autocomplete matches against.
+"""
+import html
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+ANALYZER_VERSION = "de-1"
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_BLOCK_TAG_RE = re.compile(r"</?(?:p|div|br|li|ul|ol|h[1-6]|tr|td|th|table|blockquote|pre)\b[^>]*>", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"\w+")
+
+MIN_TOKEN_LENGTH = 2
+# Longer input is truncated to this length, so a long word still matches its own prefixes
+MAX_PREFIX_LENGTH = 15
+
+STOP_WORDS = frozenset("""
+aber alle allem allen aller alles als also am an ander andere anderem anderen anderer anderes anderm
+andern anders auch auf aus bei bin bis bist da damit dann das dass dasselbe dazu dein deine deinem
+deinen deiner deines dem demselben den denn denselben der derer derselbe derselben des desselben dessen
+dich die dieselbe dieselben dies diese diesem diesen dieser dieses dir doch dort du durch ein eine einem
+einen einer eines einig einige einigem einigen einiger einiges einmal er es etwas euch euer eure eurem
+euren eurer eures für gegen gewesen hab habe haben hat hatte hatten hier hin hinter ich ihm ihn ihnen
+ihr ihre ihrem ihren ihrer ihres im in indem ins ist jede jedem jeden jeder jedes jene jenem jenen jener
+jenes jetzt kann kein keine keinem keinen keiner keines können könnte man manche manchem manchen mancher
+manches mein meine meinem meinen meiner meines mich mir mit muss musste nach nicht nichts noch nun nur ob
+oder ohne sehr sein seine seinem seinen seiner seines selbst sich sie sind so solche solchem solchen
+solcher solches soll sollte sondern sonst über um und uns unser unsere unserem unseren unserer unseres
+unter viel vom von vor während war waren warst was weg weil weiter welche welchem welchen welcher
+welches wenn werde werden wie wieder will wir wird wirst wo wollen wollte würde würden zu zum zur zwar
+zwischen
+""".split())
+
+# Words compounds are split into. Extend with COMPOUND_DICTIONARY_PATH (one word per line).
+COMPOUND_WORDS = """
+abflug abreise adresse agentur angebot ankunft anleitung anreise antrag antwort anzahlung arbeit auto
+bahn bank berg bericht bestätigung boot buchung bus büro camper camping daten datum dokument einreise
+erstattung fahrrad fahrt fähre familie fehler ferien flug flughafen formular foto frage frist führung
+gebühr gepäck gruppe gültigkeit handbuch haus hilfe hotel insel karte katalog klasse koffer kontakt
+kosten kredit kunde küste land leistung liste lösung lodge miete mietwagen mitarbeiter mobil monat motel
+national nummer notfall park pass person plan platz preis problem programm prozess rabatt rad rechnung
+regel reise reisende richtlinie route rückerstattung rückflug saison schiff schritt see service sitz
+staat stadt steuer storno stornierung strand straße system tag tarif telefon termin ticket tour
+umbuchung unterkunft urlaub vermietung vertrag versicherung visum wagen wanderung weg woche wohnmobil
+zahlung zeit zimmer zug zuschlag
+""".split()
+COMPOUND_DICTIONARY_PATH = os.environ.get("COMPOUND_DICTIONARY_PATH")
+MIN_COMPOUND_PART_LENGTH = 3
+# Fugenelemente: Reise|versicherung, Kunde|n|service, Arbeit|s|zeit
+_LINKERS = ("", "s", "es", "n", "en", "e", "er")
+
+_VOWELS = frozenset("aeiouyäöü")
+_S_ENDINGS = frozenset("bdfghklmnrt")
+_ST_ENDINGS = frozenset("bdfghklmnt")
+_UMLAUTS = str.maketrans({"ä": "a", "ö": "o", "ü": "u"})
+
+
+def html_paragraphs(content: str) -> List[str]:
+    """Plain text of the block elements (paragraphs, headings, list items...) of an HTML fragment"""
+    if not content:
+        return []
+    parts = (_TAG_RE.sub("", part) for part in _BLOCK_TAG_RE.split(content))
+    return [text for text in (_WHITESPACE_RE.sub(" ", html.unescape(part)).strip() for part in parts) if text]
+
+
+def html_to_text(content: str) -> str:
+    """Plain text of an HTML fragment; block elements become word boundaries"""
+    return " ".join(html_paragraphs(content))
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalised word tokens in document order"""
+    if not text:
+        return []
+    return [token for token in _TOKEN_RE.findall(normalize(text)) if len(token) >= MIN_TOKEN_LENGTH]
+
+
+def fold(token: str) -> str:
+    """ae/oe/ue as umlauts (not the ue of "que"), the form stem() and the dictionary work on"""
+    token = token.replace("ß", "ss").replace("ae", "ä").replace("oe", "ö")
+    return re.sub(r"(?<!q)ue", "ü", token)
+
+
+def _region(word: str, start: int) -> int:
+    """Start of the region after the first non-vowel following a vowel, searching from start"""
+    for i in range(start + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Snowball German stemmer on a folded token; the result has no umlauts"""
+    # u and y between vowels are consonants (upper case is not in _VOWELS)
+    chars = list(word)
+    for i in range(1, len(chars) - 1):
+        if chars[i] in "uy" and chars[i - 1] in _VOWELS and chars[i + 1] in _VOWELS:
+            chars[i] = chars[i].upper()
+    word = "".join(chars)
+
+    p1 = _region(word, 0)
+    p2 = _region(word, p1)
+    r1 = max(p1, 3)
+
+    def in_region(suffix_length: int, region: int) -> bool:
+        return len(word) - suffix_length >= region
+
+    # Step 1: inflectional endings
+    for suffix in ("ern", "em", "er", "en", "es", "e", "s"):
+        if word.endswith(suffix):
+            if in_region(len(suffix), r1):
+                if suffix == "s":
+                    if len(word) >= 2 and word[-2] in _S_ENDINGS:
+                        word = word[:-1]
+                else:
+                    word = word[:-len(suffix)]
+                    if suffix in ("en", "es", "e") and word.endswith("niss"):
+                        word = word[:-1]
+            break
+
+    # Step 2: comparative/superlative and verb endings
+    for suffix in ("est", "en", "er", "st"):
+        if word.endswith(suffix):
+            if in_region(len(suffix), r1):
+                if suffix == "st":
+                    if len(word) >= 6 and word[-3] in _ST_ENDINGS:
+                        word = word[:-2]
+                else:
+                    word = word[:-len(suffix)]
+            break
+
+    # Step 3: derivational suffixes
+    for suffix in ("heit", "lich", "keit", "isch", "end", "ung", "ig", "ik"):
+        if word.endswith(suffix):
+            if in_region(len(suffix), p2):
+                if suffix in ("end", "ung"):
+                    word = word[:-3]
+                    if word.endswith("ig") and in_region(2, p2) and not word[:-2].endswith("e"):
+                        word = word[:-2]
+                elif suffix in ("ig", "ik", "isch"):
+                    if not word[:-len(suffix)].endswith("e"):
+                        word = word[:-len(suffix)]
+                elif suffix in ("heit", "lich"):
+                    word = word[:-4]
+                    if word.endswith(("er", "en")) and in_region(2, r1):
+                        word = word[:-2]
+                else:
+                    word = word[:-4]
+                    for inner in ("lich", "ig"):
+                        if word.endswith(inner) and in_region(len(inner), p2):
+                            word = word[:-len(inner)]
+                            break
+            break
+
+    return word.replace("U", "u").replace("Y", "y").translate(_UMLAUTS)
+
+
+def _load_compound_words() -> FrozenSet[str]:
+    words = list(COMPOUND_WORDS)
+    if COMPOUND_DICTIONARY_PATH:
+        with open(COMPOUND_DICTIONARY_PATH, encoding="utf-8") as f:
+            words.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return frozenset(fold(normalize(word)) for word in words if len(word) >= MIN_COMPOUND_PART_LENGTH)
+
+
+_COMPOUND_WORDS = _load_compound_words()
+# The last part of a compound carries the inflection, so it is compared by stem
+_COMPOUND_STEMS = frozenset(stem(word) for word in _COMPOUND_WORDS)
+
+
+@lru_cache(maxsize=65536)
+def split_compound(word: str) -> Tuple[str, ...]:
+    """Parts of a folded compound made of dictionary words, () if it is none"""
+
+    def parts_from(start: int) -> List[str]:
+        rest = word[start:]
+        # Longest head first, so "reise|versicherung" wins over "reis|eversicherung"
+        for end in range(len(word) - MIN_COMPOUND_PART_LENGTH, start + MIN_COMPOUND_PART_LENGTH - 1, -1):
+            head = word[start:end]
+            if head not in _COMPOUND_WORDS:
+                continue
+            for linker in _LINKERS:
+                if word.startswith(linker, end) and len(word) - end - len(linker) >= MIN_COMPOUND_PART_LENGTH:
+                    tail = parts_from(end + len(linker))
+                    if tail:
+                        return [head] + tail
+        if stem(rest) in _COMPOUND_STEMS:
+            return [rest]
+        return []
+
+    if len(word) < 2 * MIN_COMPOUND_PART_LENGTH:
+        return ()
+    parts = parts_from(0)
+    return tuple(parts) if len(parts) > 1 else ()
+
+
+def analyze(text: str) -> List[str]:
+    """Search terms of a text: stems of the words and of their compound parts, in order"""
+    terms = []
+    for token in tokenize(text):
+        if token in STOP_WORDS:
+            continue
+        folded = fold(token)
+        terms.append(stem(folded))
+        terms.extend(stem(part) for part in split_compound(folded))
+    return terms
+
+
+def analyze_article(article: Dict[str, Any]) -> Dict[str, str]:
+    """Search terms of an article's searchable fields (space separated), stored as article.search"""
+    return {
+        "version": ANALYZER_VERSION,
+        "title": " ".join(analyze(article.get("title") or "")),
+        "summary": " ".join(analyze(article.get("summary") or "")),
+        "tags": " ".join(term for tag in article.get("tags") or [] for term in analyze(tag)),
+        "content": " ".join(analyze(html_to_text(article.get("content") or "")))
+    }
+
+
+def analyze_articles(articles: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """analyze_article for a batch; picklable, for running in a process pool"""
+    return [analyze_article(article) for article in articles]
+
+
+def edge_ngrams(text: str) -> List[str]:
+    """Sorted, distinct prefixes (MIN_TOKEN_LENGTH..MAX_PREFIX_LENGTH characters) of every word"""
+    grams = set()
+    for token in tokenize(text):
+        token = fold(token).translate(_UMLAUTS)
+        for length in range(MIN_TOKEN_LENGTH, min(len(token), MAX_PREFIX_LENGTH) + 1):
+            grams.add(token[:length])
+    return sorted(grams)
+
+
+def prefix_terms(query: str) -> List[str]:
+    """Words of autocomplete input in the form edge_ngrams produces them, longest (most selective) first"""
+    terms = {fold(token).translate(_UMLAUTS)[:MAX_PREFIX_LENGTH] for token in tokenize(query)}
+    return sorted(terms, key=len, reverse=True)
@@ -0,0 +1,144 @@
+"""Trigram index over a vocabulary, for finding the terms a misspelt one was meant to be.
+
+Every term is split into the trigrams of "^term$". A misspelling keeps most of
+the trigrams of the intended word - one edit changes at most four of them - so
+the terms sharing enough trigrams with the query are counted with a single
+NumPy bincount over the trigrams' posting lists. Only the candidates sharing the
+most trigrams are verified with the Damerau-Levenshtein distance, bounded to the
+few edits allowed, which keeps a lookup's cost fixed however large the
+vocabulary grows.
+
+Not thread-safe, like SearchIndex.
+"""
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# A transposition changes up to four trigrams, any other edit up to three
+GRAMS_PER_EDIT = 4
+MAX_CANDIDATES = 100
+
+
+def trigrams(term: str) -> List[str]:
+    padded = f"^{term}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def max_typos(term: str) -> int:
+    """Edits tolerated in a term: none below 4 characters, one up to 7, two from 8"""
+    if len(term) < 4 or term.isdigit():
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+def damerau_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Edits (insert, delete, substitute, swap neighbours) from a to b; max_distance + 1 if more"""
+    too_far = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return too_far
+    before = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [too_far] * len(b)
+        # Cells further than max_distance from the diagonal can't be within the bound
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > max_distance:
+            return too_far
+        before, previous = previous, current
+    return min(previous[-1], too_far)
+
+
+class TrigramIndex:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._terms: List[Optional[str]] = []
+        self._ids: Dict[str, int] = {}
+        self._free: List[int] = []
+        # trigram -> ids of the terms containing it
+        self._grams: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._ids
+
+    def add(self, term: str):
+        if term in self._ids:
+            return
+        if self._free:
+            term_id = self._free.pop()
+            self._terms[term_id] = term
+        else:
+            term_id = len(self._terms)
+            self._terms.append(term)
+        self._ids[term] = term_id
+        for gram in set(trigrams(term)):
+            posting = self._grams.get(gram)
+            if posting is None:
+                posting = self._grams[gram] = array("I")
+            posting.append(term_id)
+
+    def remove(self, term: str) -> bool:
+        term_id = self._ids.pop(term, None)
+        if term_id is None:
+            return False
+        for gram in set(trigrams(term)):
+            posting = self._grams[gram]
+            if len(posting) == 1:
+                del self._grams[gram]
+                continue
+            i = posting.index(term_id)
+            posting[i] = posting[-1]
+            posting.pop()
+        self._terms[term_id] = None
+        self._free.append(term_id)
+        return True
+
+    def similar(
+        self,
+        term: str,
+        max_distance: int,
+        deadline: Optional[float] = None
+    ) -> List[Tuple[str, int]]:
+        """Other terms within max_distance edits of term as (term, distance), closest first.
+
+        Verification stops at deadline (a time.perf_counter() value) with the
+        matches found so far.
+        """
+        grams = set(trigrams(term))
+        postings = [np.array(self._grams[gram], dtype=np.intp) for gram in grams if gram in self._grams]
+        if not postings or max_distance <= 0:
+            return []
+        shared = np.bincount(np.concatenate(postings))
+        candidates = np.flatnonzero(shared >= max(1, len(grams) - GRAMS_PER_EDIT * max_distance))
+        if len(candidates) > MAX_CANDIDATES:
+            candidates = candidates[np.argpartition(-shared[candidates], MAX_CANDIDATES)[:MAX_CANDIDATES]]
+        candidates = candidates[np.argsort(-shared[candidates], kind="stable")]
+        found = []
+        for term_id in candidates:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            other = self._terms[term_id]
+            if other == term:
+                continue
+            distance = damerau_levenshtein(term, other, max_distance)
+            if distance <= max_distance:
+                found.append((other, distance))
+        found.sort(key=lambda match: match[1])
+        return found
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "terms": len(self._ids),
+            "trigrams": len(self._grams),
+            "postings": sum(len(posting) for posting in self._grams.values())
+        }
@@ -0,0 +1,255 @@
+"""Dense article vectors and an in-process cosine similarity index.
+
+embed() turns analyzed terms into a unit float32 vector without any model or
+external service: every term and every character trigram of it is hashed to
+PROBES signed positions of a DIMENSIONS wide vector (a hashing vectorizer with a
+sparse random projection). Terms sharing stems, compound parts or most of their
+letters ("kanada", "kanadisch") end up with similar vectors, so the vector
+search finds related articles the keyword search misses.
+
+VectorIndex keeps the vectors as one contiguous float32 matrix, memory-mapped
+read-only from the file written by write_vectors(), so a restart maps the file
+instead of recomputing and all workers share one copy in the page cache. Rows
+changed since the file was written are masked out of it and kept in a small
+in-memory overlay; remap() switches to the next file written and empties the
+overlay of everything that file contains. A query is one matrix-vector product.
+
+Not thread-safe, like SearchIndex: use it from the event loop; only
+write_vectors() may run in a worker thread.
+"""
+import hashlib
+import json
+import math
+import struct
+import uuid
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from search_index import write_snapshot
+from trigram_index import trigrams
+
+DIMENSIONS = 256
+PROBES = 4
+FIELD_WEIGHTS = {"title": 3.0, "summary": 2.0, "tags": 2.0, "content": 1.0}
+# All trigrams of a term together weigh this much relative to the term itself. Less than
+# that and the hashing collisions of other terms can outweigh a shared spelling.
+TRIGRAM_WEIGHT = 1.0
+EMBEDDING_VERSION = "hash-1"
+VECTORS_FORMAT = 1
+_ALIGNMENT = 64
+
+
+def _probes(feature: str) -> Tuple[np.ndarray, np.ndarray]:
+    digest = np.frombuffer(hashlib.blake2b(feature.encode(), digest_size=2 * PROBES).digest(), dtype="<u2")
+    return (digest % DIMENSIONS).astype(np.intp), np.where(digest & 0x8000, -1.0, 1.0)
+
+
+@lru_cache(maxsize=131072)
+def _term_features(term: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions and signed weights of a term and its trigrams"""
+    grams = trigrams(term)
+    probes = [_probes("t:" + term)] + [_probes("g:" + gram) for gram in grams]
+    positions = np.concatenate([position for position, _ in probes])
+    weights = np.concatenate([sign for _, sign in probes])
+    weights[PROBES:] *= TRIGRAM_WEIGHT / math.sqrt(len(grams))
+    positions.flags.writeable = weights.flags.writeable = False
+    return positions, weights
+
+
+def embed(fields: Dict[str, Iterable[str]], field_weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Unit vector of analyzed terms per field (zero vector without terms)"""
+    field_weights = {**FIELD_WEIGHTS, **(field_weights or {})}
+    features, weights = [], []
+    for field, terms in fields.items():
+        counts = Counter(terms)
+        if not counts:
+            continue
+        features.extend(_term_features(term) for term in counts)
+        # Sublinear: a term repeated throughout a long article doesn't drown the rest
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        weights.append(field_weights.get(field, 1.0) * (1.0 + np.log(tf)))
+    if not features:
+        return np.zeros(DIMENSIONS, dtype=np.float32)
+    lengths = np.fromiter((len(positions) for positions, _ in features), dtype=np.intp, count=len(features))
+    vector = np.bincount(
+        np.concatenate([positions for positions, _ in features]),
+        np.concatenate([signs for _, signs in features]) * np.repeat(np.concatenate(weights), lengths),
+        minlength=DIMENSIONS
+    ).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class VectorIndex:
+    def __init__(self, dimensions: int = DIMENSIONS, version: str = EMBEDDING_VERSION):
+        """version identifies how vectors are computed; files written with another version are rejected"""
+        self.dimensions = dimensions
+        self.version = version
+        self.clear()
+
+    def clear(self):
+        # Rows of the mapped file; a row is masked out once its document changes or goes
+        self._matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._valid = np.zeros(0, dtype=bool)
+        # Vectors added since the file was written
+        self._recent: Dict[str, np.ndarray] = {}
+        self._recent_matrix: Optional[Tuple[List[str], np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self._rows) + len(self._recent)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows or doc_id in self._recent
+
+    def ids(self) -> List[str]:
+        return list(self._rows) + list(self._recent)
+
+    def add(self, doc_id: str, vector: np.ndarray):
+        self.remove(doc_id)
+        self._recent[doc_id] = np.asarray(vector, dtype=np.float32)
+        self._recent_matrix = None
+
+    def remove(self, doc_id: str) -> bool:
+        row = self._rows.pop(doc_id, None)
+        if row is not None:
+            self._valid[row] = False
+        elif doc_id not in self._recent:
+            return False
+        if self._recent.pop(doc_id, None) is not None:
+            self._recent_matrix = None
+        return True
+
+    def _recent_rows(self) -> Tuple[List[str], np.ndarray]:
+        if self._recent_matrix is None:
+            ids = list(self._recent)
+            matrix = np.stack([self._recent[doc_id] for doc_id in ids]) if ids else np.zeros((0, self.dimensions), dtype=np.float32)
+            self._recent_matrix = (ids, matrix)
+        return self._recent_matrix
+
+    def search(
+        self,
+        vector: np.ndarray,
+        limit: int = 10,
+        where: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """Most similar (doc_id, cosine) pairs with a positive similarity, highest first"""
+        if limit <= 0 or not len(self) or not vector.any():
+            return []
+        recent_ids, recent = self._recent_rows()
+        scores = np.concatenate([self._matrix @ vector, recent @ vector])
+        scores[:len(self._ids)][~self._valid] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        # As in SearchIndex.search: rank only as many as needed, widen if the filter rejects too many
+        wanted = limit if where is None else limit * 4
+        while True:
+            if wanted < len(candidates):
+                top = candidates[np.argpartition(-scores[candidates], wanted)[:wanted]]
+            else:
+                top = candidates
+            top = top[np.argsort(-scores[top], kind="stable")]
+            hits = []
+            for row in top:
+                doc_id = self._ids[row] if row < len(self._ids) else recent_ids[row - len(self._ids)]
+                if where is None or where(doc_id):
+                    hits.append((doc_id, float(scores[row])))
+            if len(hits) >= limit or len(top) == len(candidates):
+                return hits[:limit]
+            wanted *= 4
+
+    def snapshot(self, extra: Any = None) -> Dict[str, Any]:
+        """Current state for write_vectors(); cheap, the matrix is only gathered when writing"""
+        recent_ids, recent = self._recent_rows()
+        rows = np.flatnonzero(self._valid)
+        return {
+            "version": self.version,
+            # Identifies the file written from this snapshot for remap()
+            "token": uuid.uuid4().hex,
+            "ids": [self._ids[row] for row in rows] + recent_ids,
+            # The mapped file is never written to, so the worker thread can read it safely
+            "base": self._matrix,
+            "rows": rows,
+            "recent": recent,
+            "recent_vectors": dict(self._recent),
+            "extra": extra
+        }
+
+    def _map(self, path: str, token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Header and mapped rows of a vectors file; None if token is given and the file has another"""
+        with open(path, "rb") as f:
+            (length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(length))
+            if (header.get("format"), header.get("version"), header.get("dimensions")) != (VECTORS_FORMAT, self.version, self.dimensions):
+                raise ValueError("Vectors were written with another format or embedding")
+            if token is not None and header.get("token") != token:
+                return None
+            # Mapped through the same handle, so a file replaced meanwhile can't mix in
+            header["matrix"] = np.memmap(
+                f, dtype=np.float32, mode="r", offset=_data_offset(length), shape=(len(header["ids"]), self.dimensions)
+            ) if header["ids"] else np.zeros((0, self.dimensions), dtype=np.float32)
+        return header
+
+    def _use(self, header: Dict[str, Any]):
+        self.clear()
+        self._matrix = header["matrix"]
+        self._ids = header["ids"]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._valid = np.ones(len(self._ids), dtype=bool)
+
+    def load(self, path: str) -> Any:
+        """Map the file written by write_vectors(); returns its extra"""
+        header = self._map(path)
+        self._use(header)
+        return header["extra"]
+
+    def remap(self, path: str, snapshot: Dict[str, Any]) -> bool:
+        """After write_vectors(path, snapshot): map that file instead and drop what it holds from the overlay.
+
+        Vectors changed since the snapshot stay in the overlay. False (and nothing
+        changes) if the file has been replaced by another writer in the meantime.
+        """
+        header = self._map(path, snapshot["token"])
+        if header is None:
+            return False
+        written = snapshot["recent_vectors"]
+        # Mapped rows only ever get masked, so those still valid are the ones in the snapshot
+        unchanged = set(self._rows)
+        unchanged.update(doc_id for doc_id, vector in self._recent.items() if written.get(doc_id) is vector)
+        recent = {doc_id: vector for doc_id, vector in self._recent.items() if doc_id not in unchanged}
+        self._use(header)
+        for doc_id in [doc_id for doc_id in self._rows if doc_id not in unchanged]:
+            self._valid[self._rows.pop(doc_id)] = False
+        self._recent = recent
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "vectors": len(self),
+            "dimensions": self.dimensions,
+            "mapped": len(self._rows),
+            "recent": len(self._recent),
+            "mapped_bytes": self._matrix.nbytes
+        }
+
+
+def _data_offset(header_length: int) -> int:
+    return -(-(8 + header_length) // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_vectors(path: str, snapshot: Dict[str, Any]):
+    """Atomically replace the vectors file with a VectorIndex.snapshot() (safe to call from a worker thread)"""
+    matrix = np.concatenate([snapshot["base"][snapshot["rows"]], snapshot["recent"]]).astype(np.float32, copy=False)
+    header = json.dumps({
+        "format": VECTORS_FORMAT,
+        "version": snapshot["version"],
+        "token": snapshot["token"],
+        "dimensions": matrix.shape[1],
+        "ids": snapshot["ids"],
+        "extra": snapshot["extra"]
+    }).encode()
+    padding = _data_offset(len(header)) - 8 - len(header)
+    write_snapshot(path, [struct.pack("<Q", len(header)), header, b"\0" * padding, np.ascontiguousarray(matrix).data])
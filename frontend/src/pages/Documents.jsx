@@ -97,6 +97,7 @@ const Documents = () => {
   const [createArticleDialog, setCreateArticleDialog] = useState({ open: false, doc: null });
   const [articleTitle, setArticleTitle] = useState("");
   const [deleteDialog, setDeleteDialog] = useState({ open: false, doc: null });
+  const [progress, setProgress] = useState({});
 
   const isAdmin = user?.role === "admin";
 
@@ -113,13 +114,38 @@ const Documents = () => {
 
   useEffect(() => {
     fetchDocuments();
-    
-    // Poll for updates while documents are processing
-    const interval = setInterval(() => {
-      fetchDocuments();
-    }, 5000);
 
-    return () => clearInterval(interval);
+    // Status changes are pushed by the server; the browser reconnects with Last-Event-ID on its own
+    const source = new EventSource(`${API}/documents/events`, { withCredentials: true });
+
+    source.addEventListener("status", (event) => {
+      const update = JSON.parse(event.data);
+      setDocuments((docs) => {
+        if (docs.some((d) => d.document_id === update.document_id)) {
+          return docs.map((d) => (d.document_id === update.document_id ? { ...d, ...update } : d));
+        }
+        // Uploads from other tabs/users arrive with their full summary
+        return update.filename ? [update, ...docs] : docs;
+      });
+      if (update.status !== "processing") {
+        setProgress(({ [update.document_id]: _, ...rest }) => rest);
+      }
+    });
+
+    source.addEventListener("progress", (event) => {
+      const update = JSON.parse(event.data);
+      setProgress((current) => ({ ...current, [update.document_id]: update }));
+    });
+
+    source.addEventListener("deleted", (event) => {
+      const { document_id } = JSON.parse(event.data);
+      setDocuments((docs) => docs.filter((d) => d.document_id !== document_id));
+    });
+
+    // Missed events could not be replayed: resync the whole list
+    source.addEventListener("reset", () => fetchDocuments());
+
+    return () => source.close();
   }, [fetchDocuments]);
 
   const handleFileUpload = async (event) => {
@@ -159,6 +185,22 @@ const Documents = () => {
     }
   };
 
+  const openPreview = async (doc) => {
+    // The list only carries summary fields; load the extracted text on demand
+    setSelectedDoc(doc);
+    try {
+      const response = await axios.get(`${API}/documents/${doc.document_id}/text`);
+      setSelectedDoc((current) =>
+        current?.document_id === doc.document_id
+          ? { ...current, extracted_text: response.data.extracted_text }
+          : current
+      );
+    } catch (error) {
+      console.error("Failed to load document text:", error);
+      toast.error("Text konnte nicht geladen werden");
+    }
+  };
+
   const handleCreateArticle = async () => {
     if (!createArticleDialog.doc) return;
 
@@ -325,6 +367,19 @@ const Documents = () => {
                             <span>Sprache: {doc.original_language}</span>
                           )}
                         </div>
+                        {doc.status === "processing" && progress[doc.document_id] && (
+                          <div className="flex items-center gap-2 mt-2 w-48">
+                            <Progress
+                              value={Math.round(
+                                (progress[doc.document_id].pages_done * 100) / progress[doc.document_id].page_count
+                              )}
+                              className="h-1.5"
+                            />
+                            <span className="text-xs text-muted-foreground whitespace-nowrap">
+                              {progress[doc.document_id].pages_done}/{progress[doc.document_id].page_count} Seiten
+                            </span>
+                          </div>
+                        )}
                       </div>
                     </div>
                     <div className="flex items-center gap-3">
@@ -334,7 +389,7 @@ const Documents = () => {
                           <Button 
                             variant="outline" 
                             size="sm"
-                            onClick={() => setSelectedDoc(doc)}
+                            onClick={() => openPreview(doc)}
                             data-testid={`view-doc-${doc.document_id}`}
                           >
                             <Eye className="w-4 h-4 mr-2" />
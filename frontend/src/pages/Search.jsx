@@ -132,6 +132,20 @@ const Search = () => {
     );
   };
 
+  // Highlight the [start, end) ranges the backend found for the query terms
+  const highlightRanges = (text, ranges) => {
+    if (!text || !ranges?.length) return text;
+    const parts = [];
+    let last = 0;
+    ranges.forEach(([start, end], i) => {
+      parts.push(text.slice(last, start));
+      parts.push(<mark key={i} className="bg-yellow-200 text-yellow-900 px-0.5 rounded">{text.slice(start, end)}</mark>);
+      last = end;
+    });
+    parts.push(text.slice(last));
+    return parts;
+  };
+
   return (
     <div className="max-w-4xl mx-auto space-y-6 animate-fadeIn" data-testid="search-page">
       {/* Header */}
@@ -235,7 +249,9 @@ const Search = () => {
 
                         {/* Snippet */}
                         <p className="text-sm text-muted-foreground line-clamp-2 pl-8">
-                          {highlightMatch(result.content_snippet, query)}
+                          {result.highlights
+                            ? highlightRanges(result.content_snippet, result.highlights)
+                            : highlightMatch(result.content_snippet, query)}
                         </p>
 
                         {/* Meta */}